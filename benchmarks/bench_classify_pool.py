@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+import create_pocket_playlist
+
+# ==========================================
+# PROCESS-POOL CLASSIFY BENCHMARK
+# ==========================================
+# select_channels() over a synthetic pocket + joker pair, serial and with
+# 2, 4, ... workers up to the CPU count. Every pooled run must give the
+# serial output line for line; speedup is relative to the serial run.
+# Usage: python benchmarks/bench_classify_pool.py [entries]
+def run(sources, workers):
+    counts = {"parsed": 0, "kept": 0, "dropped": 0, "dropped_sd": 0, "duplicates": 0}
+    start = time.perf_counter()
+    lines = list(create_pocket_playlist.select_channels(sources, counts, workers))
+    return lines, counts, time.perf_counter() - start
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    sources = [("pocket", synthetic.generate_m3u(size, seed=1).splitlines()),
+               ("joker", synthetic.generate_m3u(size // 4, seed=2).splitlines())]
+    cpus = os.cpu_count() or 1
+    print(f"{size + size // 4} entries, {cpus} CPUs, {create_pocket_playlist.CLASSIFY_CHUNK} entries per task")
+    serial, serial_counts, serial_time = run(sources, 0)
+    print(f"   serial     {serial_time * 1000:>9.1f} ms")
+    workers = 2
+    while workers <= max(cpus, 2):
+        lines, counts, seconds = run(sources, workers)
+        if lines != serial or counts != serial_counts: sys.exit(f"❌ {workers} workers changed the output")
+        print(f"   {workers:>2} workers {seconds * 1000:>9.1f} ms  x{serial_time / seconds:.2f}")
+        workers *= 2
+
+if __name__ == "__main__":
+    main()
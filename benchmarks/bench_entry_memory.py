@@ -0,0 +1,75 @@
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+from m3u_parser import ATTR_RE, EXTINF_RE, iter_entries
+
+# ==========================================
+# CHANNEL RECORD MEMORY BENCHMARK
+# ==========================================
+# Memory still held after parsing a synthetic source into channel records:
+# the old representation (plain object with a __dict__, tag lists, private
+# attribute dicts) vs the slotted, interned, compacted M3UEntry.
+# Usage: python benchmarks/bench_entry_memory.py [entries]
+class LegacyEntry:
+    def __init__(self, extinf, pre, post, url, headers):
+        self.extinf = extinf
+        self.pre = pre or []
+        self.post = post or []
+        self.url = url
+        self.headers = headers
+        m = EXTINF_RE.match(extinf)
+        self.duration = m.group(1)
+        self.attrs = {k.lower(): v for k, v in ATTR_RE.findall(m.group(2))}
+        self.name = m.group(3).strip()
+        self.well_formed = True
+
+def legacy(lines):
+    # The parser loop as it was before the records were compacted
+    records, pending, extinf, post = [], [], None, []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#EXTM3U"): continue
+        if line.startswith("#EXTINF"):
+            if extinf is not None: pending = []
+            extinf = line; post = []
+        elif line.startswith("#"):
+            (post if extinf is not None else pending).append(line)
+        elif extinf is not None:
+            url, _, headers = line.partition("|")
+            records.append(LegacyEntry(extinf, pending, post, url.strip(), headers.strip()))
+            pending = []; extinf = None; post = []
+        else:
+            pending = []
+    return records
+
+def compact(lines):
+    # As the deduper holds them: compacted
+    return [entry.compact() for entry in iter_entries(lines)]
+
+def retained(func, text):
+    # Lines are split inside the traced window, so strings the records keep
+    # alive count and the ones they let go don't
+    tracemalloc.start()
+    records = func(text.splitlines())
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(records), held
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    text = synthetic.generate_m3u(count)
+    print(f"{count} synthetic entries")
+    results = {}
+    for label, func in (("legacy records", legacy), ("slotted M3UEntry", compact)):
+        n, held = retained(func, text)
+        results[label] = held
+        print(f"   {label}: {held / 1024 / 1024:.1f} MB held, {held / n:.0f} B per channel")
+    print(f"   reduction: {1 - results['slotted M3UEntry'] / results['legacy records']:.0%}")
+
+if __name__ == "__main__":
+    main()
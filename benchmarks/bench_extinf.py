@@ -0,0 +1,53 @@
+import os
+import re
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from m3u_parser import M3UEntry
+
+# ==========================================
+# EXTINF ATTRIBUTE BENCHMARK
+# ==========================================
+# Old approach (string patterns through re's internal cache, one call per
+# attribute) vs the single-pass tokenizer, over every #EXTINF line of
+# pocket_playlist.m3u. Usage: python benchmarks/bench_extinf.py [file]
+# Both return what they parsed, so neither side gets to skip work.
+def legacy(lines):
+    parsed = []
+    for line in lines:
+        grp_match = re.search(r'group-title="([^"]*)"', line, re.IGNORECASE)
+        group = grp_match.group(1).strip() if grp_match else ""
+        name = line.split(",")[-1].strip()
+        logo_match = re.search(r'tvg-logo="([^"]*)"', line)
+        logo = logo_match.group(1) if logo_match else ""
+        line = re.sub(r'group-title="[^"]*"', '', line)
+        line = re.sub(r'(#EXTINF:[-0-9]+)', '\\1 group-title="Live Events"', line)
+        parsed.append((group, name, logo, line))
+    return parsed
+
+def tokenizer(lines):
+    parsed = []
+    for line in lines:
+        entry = M3UEntry(line)
+        group, name = entry.group, entry.name
+        logo = entry.attrs.get("tvg-logo", "")
+        line = entry.extinf_with({"group-title": "Live Events"})
+        parsed.append((group, name, logo, line))
+    return parsed
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "pocket_playlist.m3u")
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [l.strip() for l in f if l.startswith("#EXTINF")]
+    print(f"{len(lines)} #EXTINF lines from {path}")
+    results = {}
+    for label, func in (("legacy re.search/re.sub", legacy), ("single-pass tokenizer", tokenizer)):
+        best = min(timeit.repeat(lambda: func(lines), number=20, repeat=5)) / 20
+        results[label] = best
+        print(f"   {label}: {best * 1000:.2f} ms per pass")
+    print(f"   speedup: {results['legacy re.search/re.sub'] / results['single-pass tokenizer']:.2f}x")
+
+if __name__ == "__main__":
+    main()
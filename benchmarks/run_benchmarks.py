@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import functools
+import http.server
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic
+
+# ==========================================
+# PLAYLIST BUILDER BENCHMARKS
+# ==========================================
+# Generates synthetic upstreams (default 1k/10k/100k entries), serves them
+# from a local HTTP stand-in, points both builders at it and times every
+# stage plus the end-to-end runs, with peak traced memory per stage. Every
+# run starts cold: no HTTP or section cache and no earlier outputs.
+# Results go to a JSON file; --compare flags stages that got slower.
+#
+#   python benchmarks/run_benchmarks.py --sizes 1000,10000 --out bench.json
+#   python benchmarks/run_benchmarks.py --compare bench.json
+DEFAULT_SIZES = [1000, 10000, 100000]
+INPUTS = {"upstream", "template.m3u", "youtube.txt", "drm.txt"}  # everything else in the workdir is output
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args): pass
+    def guess_type(self, path): return "text/plain; charset=utf-8"
+
+def serve(directory):
+    handler = functools.partial(_Handler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def reset_workdir(workdir):
+    # Caches and outputs of the previous run, so the next one takes the cold path again
+    for name in os.listdir(workdir):
+        if name in INPUTS: continue
+        path = os.path.join(workdir, name)
+        if os.path.isdir(path): shutil.rmtree(path, ignore_errors=True)
+        else: os.remove(path)
+
+def measure(func, reset):
+    # Timed on its own first, then once more under tracemalloc for the peak;
+    # reset() before each, so both runs take the same cold path
+    reset()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    reset()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def point_at_stand_in(base):
+    import create_pocket_playlist, update_playlist
+    for name in ("POCKET_URL", "ZEE_JOKER_URL"):
+        setattr(create_pocket_playlist, name, f"{base}/{'pocket' if name == 'POCKET_URL' else 'joker'}.m3u")
+    for name in ("FANCODE_URL", "SONY_LIVE_URL", "ZEE_LIVE_URL", "JIO_WORKER_URL", "YOUTUBE_LIVE_URL"):
+        setattr(create_pocket_playlist, name, f"{base}/live.m3u")
+    create_pocket_playlist.JIO_EVENTS_JSON = f"{base}/events.json"
+    create_pocket_playlist.JIO_COOKIE_JSON = f"{base}/cookie.json"
+    update_playlist.backup_url = f"{base}/backup.m3u"
+    update_playlist.pocket_url = f"{base}/pocket.m3u"
+    for name in ("fancode_url", "sony_m3u", "zee_m3u"):
+        setattr(update_playlist, name, f"{base}/live.m3u")
+
+def bench_size(size, workdir, base):
+    import convert_drm, create_pocket_playlist, update_playlist
+    from m3u_parser import iter_entries
+    from build_manifest import write_if_changed
+
+    results = []
+    def record(pipeline, stage, func):
+        with contextlib.redirect_stdout(io.StringIO()):
+            value, seconds, peak = measure(func, lambda: reset_workdir(workdir))
+        results.append({"pipeline": pipeline, "size": size, "stage": stage,
+                        "seconds": round(seconds, 6), "peak_kb": peak // 1024})
+        print(f"   {pipeline:<16} {size:>7} {stage:<10} {seconds * 1000:>10.1f} ms {peak // 1024:>9} KB")
+        return value
+
+    lines = record("pocket", "fetch", lambda: create_pocket_playlist.fetch_raw_lines(f"{base}/pocket.m3u"))
+    entries = record("pocket", "parse", lambda: list(iter_entries(lines)))
+    def dedupe():
+        deduper = create_pocket_playlist.new_deduper()
+        for e in entries: deduper.add(e, e.name, e.url)
+        return list(deduper.resolve())
+    record("pocket", "dedupe", dedupe)
+    record("pocket", "classify", lambda: [create_pocket_playlist.GROUP_CLASSIFIER.classify(e.group, e.name)
+                                          for e in entries if create_pocket_playlist.should_keep_channel(e.group, e.name)])
+    out_lines = [l for e in entries for l in e.lines()]
+    record("pocket", "write", lambda: write_if_changed(os.path.join(workdir, "bench_write.m3u"), out_lines))
+    record("pocket", "end-to-end", create_pocket_playlist.main)
+    record("playlist", "end-to-end", update_playlist.update_playlist)
+    record("drm", "end-to-end", convert_drm.parse_drm_file)
+    return results
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, "r", encoding="utf-8") as f: baseline = json.load(f)
+    old = {(r["pipeline"], r["size"], r["stage"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\n📊 Compared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for r in results:
+        prev = old.get((r["pipeline"], r["size"], r["stage"]))
+        if not prev or not prev["seconds"]: continue
+        ratio = r["seconds"] / prev["seconds"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        regressions += bool(flag)
+        print(f"   {r['pipeline']:<16} {r['size']:>7} {r['stage']:<10} x{ratio:.2f} time, "
+              f"{r['peak_kb'] - prev['peak_kb']:+} KB peak {flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the playlist builders on synthetic sources")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    out_path = os.path.abspath(args.out)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    all_results = []
+    start_dir = os.getcwd()
+    for size in [int(s) for s in args.sizes.split(",")]:
+        workdir = tempfile.mkdtemp(prefix=f"nktv-bench-{size}-")
+        try:
+            src_dir = os.path.join(workdir, "upstream")
+            files = synthetic.write_sources(src_dir, size)
+            with open(os.path.join(src_dir, "events.json"), "w") as f:
+                json.dump([{"id": str(i), "name": f"Event {i}", "languages": ["eng", "tam"]} for i in range(20)], f)
+            with open(os.path.join(src_dir, "cookie.json"), "w") as f: json.dump({"cookie": "__hdnea__=bench"}, f)
+            for name in ("template.m3u", "youtube.txt"):
+                shutil.copy(os.path.join(ROOT, name), workdir)
+            shutil.copy(files["drm.txt"], os.path.join(workdir, "drm.txt"))
+            os.chdir(workdir)
+            server, base = serve(src_dir)
+            point_at_stand_in(base)
+            print(f"⏱️ {size} entries per source")
+            all_results.extend(bench_size(size, workdir, base))
+            server.shutdown()
+        finally:
+            os.chdir(start_dir)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                       "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}, "results": all_results}
+    with open(out_path, "w", encoding="utf-8") as f: json.dump(report, f, indent=1)
+    print(f"✅ Results written to {out_path}")
+    if compare_path and compare(all_results, compare_path, args.tolerance): sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import random
+
+# ==========================================
+# SYNTHETIC PLAYLIST GENERATOR
+# ==========================================
+# Produces M3U sources shaped like the real upstreams: the same group names,
+# HD/SD pairs, duplicates across mirrors, and the usual tag mix (plain
+# entries, clearkey KODIPROP blocks before the #EXTINF, Jio-style
+# KODIPROP/EXTVLCOPT/EXTHTTP blocks after it, |header suffixes).
+GROUPS = ["Tamil", "Tamil HD", "Sports", "Sports HD", "News", "Tamil News", "Entertainment", "Movies",
+          "Zee Movies", "Infotainment", "Music", "Kids", "Premium 24/7", "Astro GO", "Malayalam News"]
+BASE_NAMES = ["Sun TV", "Star Vijay", "Colors Tamil", "Zee Tamil", "KTV", "Sun Music", "Jaya TV", "Polimer TV",
+              "Star Sports 1", "Star Sports 2", "Star Sports 1 Tamil", "SONY TEN 1", "Discovery", "Nat Geo Wild",
+              "Animal Planet", "History TV18", "Sun News", "Thanthi TV", "Puthiya Thalaimurai", "DD Sports",
+              "Rasi Movies", "J Movies", "GOOD TiMES", "Food Food", "Raj Digital Plus", "Zee Cafe"]
+UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+def _name(i, rng):
+    if rng.random() < 0.4: base = rng.choice(BASE_NAMES)
+    else: base = f"Channel {i % max(1, i // 3 + 1)}"  # roughly a third are repeats
+    return base + (" HD" if rng.random() < 0.35 else "")
+
+def _key(rng):
+    return "%032x" % rng.getrandbits(128)
+
+def generate_m3u(count, seed=0):
+    rng = random.Random(seed)
+    lines = ["#EXTM3U"]
+    for i in range(count):
+        name = _name(i, rng)
+        group = rng.choice(GROUPS)
+        logo = f"https://logos.example/{i}.png"
+        extinf = f'#EXTINF:-1 tvg-id="{i}" tvg-name="{name}" group-title="{group}" tvg-logo="{logo}",{name}'
+        url = f"https://cdn{i % 7}.example/live/{i}/index.m3u8"
+        style = rng.random()
+        if style < 0.5:
+            lines += [extinf, url]
+        elif style < 0.75:
+            lines += ["#KODIPROP:inputstream.adaptive.license_type=clearkey",
+                      f"#KODIPROP:inputstream.adaptive.license_key={_key(rng)}:{_key(rng)}", extinf, url.replace(".m3u8", ".mpd")]
+        elif style < 0.95:
+            lines += [extinf, "#KODIPROP:inputstream.adaptive.license_type=clearkey",
+                      f"#KODIPROP:inputstream.adaptive.license_key=https://keys.example/?keyid={_key(rng)}&key={_key(rng)}",
+                      "#EXTVLCOPT:http-user-agent=plaYtv/7.1.3 (Linux;Android 13) ExoPlayerLib/824.0",
+                      '#EXTHTTP:{"cookie":"__hdnea__=st=1768595103~exp=1768681503~acl=/*~hmac=' + _key(rng) + '"}',
+                      url.replace(".m3u8", ".mpd")]
+        else:
+            lines += [extinf, f"{url}|User-Agent={UA}&Referer=https://example.com/"]
+    return "\n".join(lines) + "\n"
+
+def generate_drm(count, seed=0):
+    # drm.txt style: KODIPROP, EXTINF and URL, sometimes crammed onto one line
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        name = _name(i, rng)
+        kodi = f"#KODIPROP:inputstream.adaptive.license_type=clearkey #KODIPROP:inputstream.adaptive.license_key={_key(rng)}:{_key(rng)}"
+        extinf = f'#EXTINF:-1 tvg-logo="https://logos.example/{i}.png" group-title="StarzPlay",{name}'
+        url = f"https://ev.example/live/{i}/DASH/{i}.mpd"
+        if rng.random() < 0.5: lines.append(f"{kodi} {extinf} {url} ")
+        else: lines.extend(kodi.split(" ") + [extinf, url])
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+def write_sources(directory, count, seed=0):
+    # One file per upstream; different seeds so mirrors overlap but differ
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for offset, name in enumerate(["pocket.m3u", "joker.m3u", "backup.m3u", "live.m3u"]):
+        size = count if name != "live.m3u" else max(10, count // 50)
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as f: f.write(generate_m3u(size, seed + offset))
+        files[name] = path
+    path = os.path.join(directory, "drm.txt")
+    with open(path, "w", encoding="utf-8") as f: f.write(generate_drm(max(10, count // 10), seed))
+    files["drm.txt"] = path
+    return files
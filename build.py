@@ -0,0 +1,54 @@
+import sys
+import http_session
+import update_playlist
+import create_pocket_playlist
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# Every playlist this repo publishes. A new variant is one more builder here;
+# whatever upstreams it shares with the others cost nothing extra.
+OUTPUTS = [
+    ("playlist.m3u", update_playlist.update_playlist),
+    ("pocket_playlist.m3u", create_pocket_playlist.main),
+]
+
+# ==========================================
+# ONE-PROCESS BUILD
+# ==========================================
+# Runs the builders back to back with shared HTTP responses: fancode, sony,
+# zee5 and the Pocket index are downloaded and parsed once for both
+# playlists instead of once per workflow. A builder that bails out doesn't
+# stop the others; the exit code reports it, and the workflow still commits
+# the outputs that were written.
+#
+#   python build.py                      -> every output
+#   python build.py pocket_playlist.m3u  -> just that one
+#   python build.py serve [--port N]     -> long-running daemon, see serve.py
+def build_outputs(selected=None):
+    # -> names of the outputs that failed
+    failed = []
+    for name, build in OUTPUTS:
+        if selected and name not in selected: continue
+        print(f"\n=== Building {name} ===")
+        try: build()
+        except SystemExit as e:
+            if e.code: failed.append(name)
+        except Exception as e:
+            print(f"❌ {name} failed: {e}")
+            failed.append(name)
+    return failed
+
+def main(selected=None):
+    http_session.share_responses()
+    failed = build_outputs(selected)
+    http_session.share_responses(False)
+    if failed:
+        print(f"❌ Failed outputs: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        import serve
+        serve.main(sys.argv[2:])
+    else: main(sys.argv[1:])
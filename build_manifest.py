@@ -0,0 +1,129 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import metrics
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+CACHE_DIR = os.path.join(".cache", "sections")
+MANIFEST_FILE = os.path.join(".cache", "manifest.json")
+# Header lines that change on every run and don't count as content
+VOLATILE_PREFIXES = ("# Updated on:", "# Last Updated:")
+
+# ==========================================
+# CONTENT HASHES
+# ==========================================
+def digest(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        if part is None: part = b""
+        elif isinstance(part, str): part = part.encode("utf-8")
+        elif not isinstance(part, bytes): part = json.dumps(part, sort_keys=True).encode("utf-8")
+        h.update(hashlib.sha1(part).digest())
+    return h.hexdigest()
+
+def file_digest(path):
+    # Same value as digest(<file bytes>), read in chunks
+    h = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""): h.update(chunk)
+    except OSError: return digest(None)
+    return hashlib.sha1(h.digest()).hexdigest()
+
+# Cached sections are only valid for the code that built them
+_here = os.path.dirname(os.path.abspath(__file__))
+CODE_DIGEST = digest(*[file_digest(p) for p in sorted(glob.glob(os.path.join(_here, "*.py")))])
+
+# ==========================================
+# SECTION CACHE + MANIFEST
+# ==========================================
+# section(name, inputs, build) returns build()'s (JSON-serializable) result,
+# or the stored copy when the hash of `inputs` matches the last run, so
+# unchanged templates/upstreams skip parsing entirely. Every input hash is
+# recorded in .cache/manifest.json for the run.
+_lock = threading.Lock()
+_manifest = {}
+STATS = {"reused": 0, "rebuilt": 0}
+
+def section(name, inputs, build):
+    key = digest(CODE_DIGEST, *inputs)
+    path = os.path.join(CACHE_DIR, hashlib.sha1(name.encode("utf-8")).hexdigest() + ".json")
+    with _lock: _manifest[name] = key
+    try:
+        with open(path, "r", encoding="utf-8") as f: cached = json.load(f)
+        if cached.get("key") == key:
+            with _lock: STATS["reused"] += 1
+            return cached["value"]
+    except (OSError, ValueError): pass
+
+    value = build()
+    with _lock: STATS["rebuilt"] += 1
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump({"name": name, "key": key, "value": value}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Could not cache section {name}: {e}")
+    return value
+
+def save_manifest():
+    try:
+        os.makedirs(os.path.dirname(MANIFEST_FILE), exist_ok=True)
+        with open(MANIFEST_FILE, "w", encoding="utf-8") as f: json.dump(_manifest, f, indent=1, sort_keys=True)
+    except OSError: pass
+    print(f"♻️ Sections: reused {STATS['reused']} | rebuilt {STATS['rebuilt']}")
+
+# ==========================================
+# STREAMING, ATOMIC, WRITE ONLY REAL CHANGES
+# ==========================================
+# `lines` can be any iterable (usually a generator chain straight from the
+# parsers), so the playlist is never held in memory as a whole. It is
+# written to a temp file next to `path` and renamed into place, so a crash
+# mid-run leaves the previous playlist intact instead of a truncated one.
+# Old and new content are compared by hash, skipping the timestamp header.
+def _content_hash(lines):
+    h = hashlib.sha1()
+    for line in lines:
+        if not line.startswith(VOLATILE_PREFIXES): h.update(line.encode("utf-8") + b"\n")
+    return h.digest()
+
+def read_lines(path):
+    # Same lines as f.read().split("\n"), without loading the whole file
+    with open(path, "r", encoding="utf-8") as f:
+        line = ""
+        for line in f:
+            yield line[:-1] if line.endswith("\n") else line
+        if line == "" or line.endswith("\n"): yield ""
+
+def write_if_changed(path, lines):
+    # Returns True if the file was replaced. The timestamp header alone is not a change.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    counts = {"lines": 0, "entries": 0}
+    new_hash = hashlib.sha1()
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for line in lines:
+                if counts["lines"]: f.write("\n")
+                f.write(line)
+                counts["lines"] += 1
+                if line.startswith("#EXTINF"): counts["entries"] += 1
+                if not line.startswith(VOLATILE_PREFIXES): new_hash.update(line.encode("utf-8") + b"\n")
+    except BaseException:
+        try: os.remove(tmp_path)
+        except OSError: pass
+        raise
+
+    try: unchanged = _content_hash(read_lines(path)) == new_hash.digest()
+    except OSError: unchanged = False
+    metrics.record("stages", "write", written=not unchanged, **counts)
+    if unchanged:
+        os.remove(tmp_path)
+        print(f"💤 No channel changes, {path} left untouched.")
+        return False
+    os.replace(tmp_path, path)
+    return True
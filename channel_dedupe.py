@@ -0,0 +1,74 @@
+import re
+
+# ==========================================
+# CANONICAL CHANNEL IDENTITY
+# ==========================================
+# A channel name is split into alphanumeric tokens and reduced to
+# (base, tier, language, variant):
+#   "Star Sports 1 Tamil HD" -> ("starsports1", 1, "tamil", False)
+#   "Star Sports HD1"        -> ("starsports1", 1, None, False)
+#   "Zee Tamil HD APAC"      -> ("zee", 1, "tamil", True)
+# Quality is only read from whole tokens ("hd", "fhd", "4k", "hd1", ...), so
+# names that merely contain the letters ("Shdw") keep their base intact.
+QUALITY_TIERS = {"sd": 0, "hd": 1, "fhd": 2, "uhd": 3, "4k": 3}
+LANGUAGES = {"tamil", "telugu", "hindi", "kannada", "malayalam", "english", "bengali", "marathi",
+             "punjabi", "gujarati", "odia", "bangla"}
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+NUMBERED_TIER_RE = re.compile(r'^(?:(fhd|uhd|hd)(\d+)|(\d+)(fhd|uhd|hd))$')
+
+def channel_identity(name, variant_tokens=()):
+    base, tier, lang, variant = [], 0, None, False
+    for token in TOKEN_RE.findall(name.lower()):
+        if token in QUALITY_TIERS: tier = max(tier, QUALITY_TIERS[token]); continue
+        numbered = NUMBERED_TIER_RE.match(token)
+        if numbered:
+            tier = max(tier, QUALITY_TIERS[numbered.group(1) or numbered.group(4)])
+            base.append(numbered.group(2) or numbered.group(3))
+        elif token in LANGUAGES and lang is None: lang = token
+        elif token in variant_tokens: variant = True
+        else: base.append(token)
+    return "".join(base) or "".join(TOKEN_RE.findall(name.lower())), tier, lang, variant
+
+# ==========================================
+# SINGLE-PASS DEDUPE WITH DEFERRED EMISSION
+# ==========================================
+# add() is called once per entry, in playlist order, and only updates the
+# per-identity bookkeeping; roles are decided in resolve() once every source
+# has been seen, and entries come back in their original order:
+#   "drop"    -> SD copy of a channel that also exists in HD (or better)
+#   "primary" -> the best copy of its (base, language, tier)
+#   "backup"  -> every other copy
+# The best copy is the one that is not a regional variant, then the one
+# carrying the channel's preferred marker (if the policy names one), then the
+# first seen. `origin` is whatever text identifies the copy (source name,
+# tvg-id, URL); the marker is a lowercase substring of it.
+class ChannelDeduper:
+    def __init__(self, preferred_copies=None, variant_tokens=()):
+        self.variant_tokens = {t.lower() for t in variant_tokens}
+        self.preferred = {}
+        for name, marker in (preferred_copies or {}).items():
+            base, _, lang, _ = channel_identity(name)
+            self.preferred[(base, lang)] = marker.lower()
+        self.slots = []      # (item, key, tier)
+        self.best = {}       # (base, lang, tier) -> (rank, slot index)
+        self.upgraded = set()  # (base, lang) that exist above SD
+
+    def identity(self, name):
+        return channel_identity(name, self.variant_tokens)
+
+    def add(self, item, name, origin="", identity=None):
+        # `identity` lets callers that computed identity(name) elsewhere (a worker process) skip it here
+        base, tier, lang, variant = identity or self.identity(name)
+        key = (base, lang, tier)
+        pos = len(self.slots)
+        marker = self.preferred.get((base, lang))
+        rank = (variant, marker is not None and marker not in origin.lower(), pos)
+        if key not in self.best or rank < self.best[key][0]: self.best[key] = (rank, pos)
+        if tier: self.upgraded.add((base, lang))
+        self.slots.append((item, key, tier))
+
+    def resolve(self):
+        for pos, (item, key, tier) in enumerate(self.slots):
+            if not tier and key[:2] in self.upgraded: yield item, "drop"
+            elif self.best[key][1] == pos: yield item, "primary"
+            else: yield item, "backup"
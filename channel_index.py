@@ -0,0 +1,98 @@
+import re
+
+# ==========================================
+# NAME NORMALIZATION
+# ==========================================
+BRACKETS_RE = re.compile(r'\[.*?\]|\(.*?\)')
+NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9]')
+DIGITS_RE = re.compile(r'\d+')
+# Words that make a different channel out of the same name: the HD/SD feed,
+# the kids spin-off, the radio station, another language. Keys have no spaces,
+# so they're looked for as substrings; both sides are searched the same way.
+MARKER_TOKENS = ("uhd", "hd", "sd", "jr", "junior", "kids", "plus", "fm", "radio",
+                 "hindi", "tamil", "telugu", "kannada", "malayalam", "marathi", "bangla",
+                 "bengali", "gujarati", "punjabi", "odia", "urdu", "english")
+
+def clean_name_key(name):
+    name = BRACKETS_RE.sub('', name)
+    name = NON_ALNUM_RE.sub('', name)
+    return name.lower().strip()
+
+def marker_tokens(key):
+    return frozenset(t for t in MARKER_TOKENS if t in key)
+
+def _trigrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# ==========================================
+# CHANNEL NAME INDEX
+# ==========================================
+# Built once per run over every source map (name key -> value) in priority
+# order. resolve() tries, per source: the exact key, then the NAME_OVERRIDES
+# alias of the key. Only if nothing hits anywhere does it fall back to a
+# trigram lookup, which scores the few keys sharing grams with the name
+# (Dice coefficient) instead of scanning every channel. Channel numbers and
+# marker tokens must agree exactly, so "Star Sports 1 HD" can never resolve
+# to "... 2 HD", "Star Vijay HD" to "Star Vijay" or "Nickelodeon Jr." to
+# "Nickelodeon"; only spelling variants of the same channel get through.
+FUZZY_THRESHOLD = 0.8
+
+class ChannelIndex:
+    def __init__(self, overrides, threshold=FUZZY_THRESHOLD):
+        self.aliases = {clean_name_key(k): clean_name_key(v) for k, v in overrides.items()}
+        self.threshold = threshold
+        self.sources = []  # [(label, {key: value})]
+        self.grams = {}    # trigram -> set of (source position, key)
+        self.gram_counts = {}
+
+    def add_source(self, label, key_map):
+        pos = len(self.sources)
+        self.sources.append((label, key_map))
+        for key in key_map:
+            grams = _trigrams(key)
+            self.gram_counts[(pos, key)] = len(grams)
+            for g in grams: self.grams.setdefault(g, set()).add((pos, key))
+
+    def resolve(self, name):
+        # -> (source label, value, how) or None; how is "exact", "alias" or "fuzzy"
+        key = clean_name_key(name)
+        alias = self.aliases.get(key)
+        for label, key_map in self.sources:
+            if key in key_map: return label, key_map[key], "exact"
+            if alias and alias in key_map: return label, key_map[alias], "alias"
+        return self._fuzzy(alias or key)
+
+    def resolve_all(self, name):
+        # -> every source's match in priority order, [(label, value, how)];
+        # fuzzy (best single match) only when no source has the name itself
+        key = clean_name_key(name)
+        alias = self.aliases.get(key)
+        found = []
+        for label, key_map in self.sources:
+            if key in key_map: found.append((label, key_map[key], "exact"))
+            elif alias and alias in key_map: found.append((label, key_map[alias], "alias"))
+        if found: return found
+        match = self._fuzzy(alias or key)
+        return [match] if match else []
+
+    def _fuzzy(self, key):
+        if not key: return None
+        grams = _trigrams(key)
+        shared = {}
+        for g in grams:
+            for cand in self.grams.get(g, ()): shared[cand] = shared.get(cand, 0) + 1
+
+        digits, markers = DIGITS_RE.findall(key), marker_tokens(key)
+        best = None
+        for (pos, cand), common in shared.items():
+            score = 2 * common / (len(grams) + self.gram_counts[(pos, cand)])
+            if score < self.threshold or DIGITS_RE.findall(cand) != digits: continue
+            if marker_tokens(cand) != markers: continue
+            # Higher score wins; ties go to the higher-priority source, then the key
+            rank = (-score, pos, cand)
+            if best is None or rank < best: best = rank
+        if best is None: return None
+        _, pos, cand = best
+        label, key_map = self.sources[pos]
+        return label, key_map[cand], "fuzzy"
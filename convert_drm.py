@@ -1,4 +1,10 @@
-import re
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from m3u_parser import iter_entries, split_crammed_lines
+from build_manifest import write_if_changed
+from youtube_txt import YoutubeChannel, format_youtube_txt
 
 # ================= CONFIGURATION =================
 INPUT_FILE = "drm.txt"
@@ -6,84 +12,102 @@ OUTPUT_FILE = "ready_for_youtube.txt"
 
 # Default headers to ensure playback works (StarzPlay/Jio often need these)
 DEFAULT_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-DEFAULT_REF = "https://starzplayarabia.com/" 
+DEFAULT_REF = "https://starzplayarabia.com/"
+MAX_WORKERS = 4
 # =================================================
 
-def parse_drm_file():
-    print(f"Reading from {INPUT_FILE}...")
-    
-    try:
-        with open(INPUT_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        print(f"❌ Error: {INPUT_FILE} not found. Please create it first.")
-        return
-
+def convert_entries(lines, fmt="youtube"):
+    # -> (output lines, parsed count, skipped count) for one input.
+    # Lines are re-split at tag boundaries first, so entries crammed onto a
+    # single line are read like any other.
     output_lines = []
-    
-    # Temporary variables to hold channel info
-    current_key = ""
-    current_logo = ""
-    current_title = ""
-    current_url = ""
+    counts = {"extinf": 0, "parsed": 0}
+
+    def tokens():
+        for token in split_crammed_lines(lines):
+            if token.startswith("#EXTINF"): counts["extinf"] += 1
+            yield token
+
+    for entry in iter_entries(tokens()):
+        # 1. Extract License Key (key is usually after the equals sign)
+        current_key = ""
+        for prop in entry.props:
+            if "license_key=" in prop:
+                current_key = prop.split("license_key=")[1].strip()
 
-    for line in lines:
-        line = line.strip()
-        if not line: continue
+        # 2. Title and Logo come from the #EXTINF line
+        current_logo = entry.attrs.get("tvg-logo", "")
+        current_title = entry.name
 
-        # 1. Extract License Key
-        if "license_key=" in line:
-            # key is usually after the equals sign
-            parts = line.split("license_key=")
-            if len(parts) > 1:
-                current_key = parts[1].strip()
+        # --- FORMATTING THE ENTRY ---
+        if not (entry.url and current_title): continue
+        counts["parsed"] += 1
+        # Build the headers string
+        headers = f"User-Agent={DEFAULT_UA}&Referer={DEFAULT_REF}"
 
-        # 2. Extract Title and Logo
-        elif line.startswith("#EXTINF"):
-            # Extract Logo
-            logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-            if logo_match:
-                current_logo = logo_match.group(1)
-            
-            # Extract Title (everything after the comma)
-            title_parts = line.split(",")
-            if len(title_parts) > 1:
-                current_title = title_parts[-1].strip()
+        if fmt == "m3u":
+            # Props stay as KODIPROP lines, players read the key from there
+            output_lines.extend(entry.lines()[:-1])
+            output_lines.append(f"{entry.url_line}|{headers}" if not entry.headers else entry.url_line)
+            continue
 
-        # 3. Extract URL (Lines that are not comments/tags)
-        elif not line.startswith("#"):
-            current_url = line
-            
-            # --- FORMATTING THE ENTRY ---
-            if current_url and current_title:
-                # Build the headers string
-                headers = f"User-Agent={DEFAULT_UA}&Referer={DEFAULT_REF}"
-                
-                # Append clearkey if found
-                if current_key:
-                    headers += f"&clearkey={current_key}"
-                
-                # Create the formatted block for youtube.txt
-                output_lines.append(f"Title: {current_title}")
-                if current_logo:
-                    output_lines.append(f"Logo: {current_logo}")
-                
-                # Combine URL + Pipe + Headers
-                final_link = f"{current_url}|{headers}"
-                output_lines.append(f"Link: {final_link}")
-                output_lines.append("") # Empty line for separation
+        # Append clearkey if found
+        if current_key:
+            headers += f"&clearkey={current_key}"
 
-            # Reset variables for next channel
-            current_key = ""
-            current_logo = ""
-            current_title = ""
-            current_url = ""
+        # Combine URL + Pipe + Headers into a youtube.txt block
+        final_link = f"{entry.url_line}|{headers}"
+        output_lines.extend(format_youtube_txt([YoutubeChannel(current_title, current_logo, (), final_link)]))
+    return output_lines, counts["parsed"], counts["extinf"] - counts["parsed"]
 
-    # Write to output file
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write("\n".join(output_lines))
+def convert_file(path, fmt="youtube"):
+    if path == "-": return convert_entries(sys.stdin, fmt)
+    with open(path, "r", encoding="utf-8") as f: return convert_entries(f, fmt)
 
+# ================= BATCH MODE =================
+# Every input is converted on its own worker; results are joined in the order
+# the inputs were given. Missing files are reported and skipped.
+def convert_batch(paths, output=OUTPUT_FILE, fmt="youtube", jobs=MAX_WORKERS):
+    log = sys.stderr if output == "-" else sys.stdout  # keep stdout clean for the converted list
+    results = {}
+    existing = [p for p in paths if p == "-" or os.path.exists(p)]
+    for path in paths:
+        if path not in existing: print(f"❌ Error: {path} not found.", file=log)
+    files = [p for p in existing if p != "-"]
+    if len(files) > 1 and jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as pool:
+            results.update(zip(files, pool.map(convert_file, files, [fmt] * len(files))))
+    for path in existing:
+        if path not in results: results[path] = convert_file(path, fmt)
+
+    output_lines = ["#EXTM3U"] if fmt == "m3u" else []
+    for path in existing:
+        lines, parsed, skipped = results[path]
+        print(f"   {'stdin' if path == '-' else path}: parsed {parsed} | skipped {skipped}", file=log)
+        output_lines.extend(lines)
+    if output == "-":
+        sys.stdout.write("\n".join(output_lines) + "\n")
+    else:
+        write_if_changed(output, output_lines)
+    return results
+
+def parse_drm_file():
+    print(f"Reading from {INPUT_FILE}...")
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ Error: {INPUT_FILE} not found. Please create it first.")
+        return
+    convert_batch([INPUT_FILE], OUTPUT_FILE)
     print(f"✅ Conversion Complete! Check '{OUTPUT_FILE}' for your links.")
 
 if __name__ == "__main__":
-    parse_drm_file()
+    # python convert_drm.py                          -> drm.txt to ready_for_youtube.txt
+    # python convert_drm.py a.txt b.txt -o all.txt   -> many files, one output
+    # cat x.txt | python convert_drm.py - -o - --format m3u
+    parser = argparse.ArgumentParser(description="Convert clearkey DRM lists to youtube.txt or M3U entries")
+    parser.add_argument("inputs", nargs="*", help="input files, '-' for stdin")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE, help="output file, '-' for stdout")
+    parser.add_argument("--format", choices=["youtube", "m3u"], default="youtube")
+    parser.add_argument("--jobs", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+    if not args.inputs: parse_drm_file()
+    else: convert_batch(args.inputs, args.output, args.format, args.jobs)
@@ -1,8 +1,18 @@
-import requests
-import re
 import datetime
 import os
 import sys
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import http_session
+import metrics
+from fetch_pool import run_fetch_jobs
+from probe import apply_probe
+from m3u_parser import iter_entries, iter_entry_chunks
+from group_rules import GroupClassifier, KeywordMatcher
+from channel_dedupe import ChannelDeduper
+from youtube_txt import load_youtube_txt, render_m3u
+from output_variants import write_variants
+from build_manifest import write_if_changed
 
 # ==========================================
 # CONFIGURATION
@@ -34,57 +44,69 @@ MOVE_TO_INFOTAINMENT_SD = ["GOOD TiMES", "Food Food"]
 SPORTS_HD_KEEP = ["Star Sports 1 HD", "Star Sports 2 HD", "Star Sports 1 Tamil HD", "Star Sports 2 Tamil HD", "Star Sports Select 1 HD", "Star Sports Select 2 HD", "SONY TEN 1 HD", "SONY TEN 2 HD", "SONY TEN 5 HD"]
 INFOTAINMENT_KEYWORDS = ["discovery", "animal planet", "nat geo", "history tv", "tlc", "bbc earth", "sony bbc", "fox life", "travelxp"]
 
+# Regrouping rules, top to bottom; a later match overrides an earlier one
+GROUP_RULES = [
+    {"group_is": ["tamil"], "to": "Tamil Extra"},
+    {"group_has": ["premium 24/7", "astro go"], "to": "Tamil Extra"},
+    {"group_is": ["sports"], "to": "Sports Extra"},
+    {"group_has": ["entertainment", "music", "zee movie", "movies"], "to": "Others"},
+    {"group_has": ["infotainment"], "to": "Infotainment HD"},
+    {"group_has": ["news"], "unless_group_has": ["tamil", "malayalam"], "to": "English and Hindi News"},
+    {"name_has": ["sports"], "if_group_so_far": "Tamil Extra", "to": "Sports Extra"},
+    {"name_has": ["j movies", "raj digital plus", "rasi movies", "rasi hollywood"], "to": "Tamil Extra"},
+    {"name_has": ["dd sports"], "to": "Sports Extra"},
+    {"name_has": MOVE_TO_INFOTAINMENT_SD, "to": "Infotainment SD"},
+    {"name_has": INFOTAINMENT_KEYWORDS, "unless_name_has": ["hd"], "to": "Infotainment SD"},
+    {"name_has": SPORTS_HD_KEEP, "to": "Sports HD"},
+    {"name_is": MOVE_TO_TAMIL_NEWS, "to": "Tamil News"},
+    {"name_is": MOVE_TO_TAMIL_HD, "to": "Tamil HD"},
+]
+
 # 3. DELETE LIST
 # UPDATED: Added "local channels" to delete list
 BAD_KEYWORDS = ["fashion", "overseas", "yupp", "usa", "pluto", "sun nxt", "sunnxt", "jio specials hd", "zee devotional", "extras", "local channels"]
 
-# 4. AUTO LOGO
+# 4. DEDUPE POLICY
+# Which copy becomes the primary when several carry the channel (default: first seen).
+# The marker is matched against the copy's source name, tvg-id and URL.
+PREFERRED_COPY = {"Zee Tamil": "0-9-zeetamil"}
+# Name tokens marking a regional feed; it only becomes primary if the plain feed is missing
+VARIANT_TOKENS = ["apac"]
+
+# 5. PARALLEL CLASSIFY
+# CLASSIFY_WORKERS > 1 parses, filters and classifies the big sources in a
+# process pool, CLASSIFY_CHUNK entries per task. Off by default: at today's
+# source sizes starting the pool costs more than it saves.
+CLASSIFY_WORKERS = int(os.environ.get("CLASSIFY_WORKERS", 0))
+CLASSIFY_CHUNK = 5000
+
+# 6. AUTO LOGO
 LOGO_MAP = {"willow": "https://i.imgur.com/39s1fL3.png", "fox": "https://i.imgur.com/39s1fL3.png"}
 UA_HEADER = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
-def get_group_and_name(line):
-    grp_match = re.search(r'group-title="([^"]*)"', line, re.IGNORECASE)
-    group = grp_match.group(1).strip() if grp_match else ""
-    name = line.split(",")[-1].strip()
-    return group, name
+# Compiled once at startup
+GROUP_CLASSIFIER = GroupClassifier(GROUP_RULES)
+BAD_MATCHER = KeywordMatcher(BAD_KEYWORDS)
 
-def should_keep_channel(group, name):
-    check_str = (group + " " + name).lower()
-    for bad in BAD_KEYWORDS:
-        if bad in check_str: return False 
-    return True
+def new_deduper():
+    return ChannelDeduper(PREFERRED_COPY, VARIANT_TOKENS)
 
-def get_clean_id(name):
-    name = name.lower().replace("hd", "").replace(" ", "").strip()
-    return re.sub(r'[^a-z0-9]', '', name)
+def should_keep_channel(group, name):
+    return not BAD_MATCHER.search((group + " " + name).lower())
 
 def fetch_raw_lines(url):
-    try:
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
-        if r.status_code == 200:
-            return r.text.splitlines()
-    except Exception as e:
-        print(f"⚠️ Failed to fetch {url}: {e}")
-    return []
+    # Lines arrive as the body downloads, HTML wrapper before the first channel skipped
+    r = http_session.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30, stream=True)
+    r.raise_for_status()
+    return r.lines()
 
 def fetch_live_events(url, force_group="Live Events"):
     lines = []
-    try:
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15)
-        if r.status_code == 200:
-            content = r.text.splitlines()
-            for line in content:
-                line = line.strip()
-                if not line: continue
-                if line.startswith("#EXTM3U"): continue
-                if line.startswith("#EXTINF"):
-                    line = re.sub(r'group-title="([^"]*)"', '', line)
-                    line = re.sub(r'(#EXTINF:[-0-9]+)', f'\\1 group-title="{force_group}"', line)
-                    lines.append(line)
-                elif not line.startswith("#"):
-                    lines.append(line)
-    except Exception as e:
-        print(f"⚠️ Error fetching {url}: {e}")
+    r = http_session.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15, stream=True)
+    r.raise_for_status()
+    for entry in r.entries():
+        lines.append(entry.extinf_with({"group-title": force_group}))
+        lines.append(entry.url_line)
     return lines
 
 # === RECURSIVE COOKIE FINDER ===
@@ -109,77 +131,62 @@ def find_cookie_recursive(data):
 def fetch_jio_hotstar_live():
     lines = []
     print("📥 Fetching JioHotstar Live Events...")
-    try:
-        # 1. Fetch Cookie
-        cookie_val = ""
-        c_data = None
-        try:
-            c_resp = requests.get(JIO_COOKIE_JSON, headers={"User-Agent": UA_HEADER}, timeout=10)
-            if c_resp.status_code == 200:
-                c_data = c_resp.json()
-        except Exception as e:
-            print(f"⚠️ Error fetching Jio Cookie: {e}")
-            return []
-
-        if c_data is None: return []
-
-        raw_cookie = find_cookie_recursive(c_data)
-        if not raw_cookie:
-            print("⚠️ FATAL: No cookie found.")
-            return []
-            
-        cookie_val = raw_cookie.strip().replace('"', '').replace('\\"', '').replace('}', '').replace('{', '')
-
-        # 2. Fetch Events
-        e_resp = requests.get(JIO_EVENTS_JSON, headers={"User-Agent": UA_HEADER}, timeout=10)
-        if e_resp.status_code != 200:
-            print("⚠️ Failed to fetch Jio Events JSON")
-            return []
+    # 1. Fetch Cookie
+    c_resp = http_session.get(JIO_COOKIE_JSON, headers={"User-Agent": UA_HEADER}, timeout=10)
+    c_resp.raise_for_status()
+    c_data = c_resp.json()
+
+    raw_cookie = find_cookie_recursive(c_data)
+    if not raw_cookie:
+        raise ValueError("No cookie found in Jio cookie JSON")
         
-        events = e_resp.json()
-        if isinstance(events, dict):
-            events = events.get("items", []) or events.get("events", []) or events.get("data", [])
-
-        count = 0
-        for event in events:
-            vid_id = event.get("id") or event.get("contentId") or event.get("ID")
-            title = event.get("name") or event.get("title") or event.get("eventName") or "Jio Event"
-            logo = event.get("logo") or event.get("image") or event.get("thumbnail") or ""
-            
-            if not vid_id: continue
-
-            # === LANGUAGE PARSING ===
-            langs_data = event.get("languages") or event.get("language") or event.get("lang")
-            processed_langs = []
-
-            if isinstance(langs_data, dict):
-                for name, code in langs_data.items():
-                    processed_langs.append((code, name))
-            elif isinstance(langs_data, list):
-                for code in langs_data:
-                    processed_langs.append((code, code.upper()))
-            elif isinstance(langs_data, str):
-                parts = [x.strip() for x in langs_data.split(",")]
-                for p in parts:
-                    processed_langs.append((p, p.upper()))
-            else:
-                processed_langs.append(("eng", "English"))
-
-            for lang_code, lang_name in processed_langs:
-                stream_url = (
-                    f'{JIO_BASE_STREAM}?id={vid_id}&lang={lang_code}&{JIO_UID_PASS}'
-                    f'|Cookie="{cookie_val}"&User-Agent="{JIO_UA}"&Referer="{JIO_REF}"'
-                )
-                display_name = f"JioHotstar: [{lang_name}] {title}"
-                lines.append(f'#EXTINF:-1 group-title="Live Events" tvg-logo="{logo}",{display_name}')
-                lines.append(stream_url)
-                count += 1
-        
-        print(f"   --> Generated {count} JioHotstar lines.")
+    cookie_val = raw_cookie.strip().replace('"', '').replace('\\"', '').replace('}', '').replace('{', '')
 
-    except Exception as e:
-        print(f"⚠️ Critical Error in JioHotstar Fetcher: {e}")
+    # 2. Fetch Events
+    e_resp = http_session.get(JIO_EVENTS_JSON, headers={"User-Agent": UA_HEADER}, timeout=10)
+    e_resp.raise_for_status()
+    
+    events = e_resp.json()
+    if isinstance(events, dict):
+        events = events.get("items", []) or events.get("events", []) or events.get("data", [])
+
+    count = 0
+    for event in events:
+        vid_id = event.get("id") or event.get("contentId") or event.get("ID")
+        title = event.get("name") or event.get("title") or event.get("eventName") or "Jio Event"
+        logo = event.get("logo") or event.get("image") or event.get("thumbnail") or ""
+        
+        if not vid_id: continue
+
+        # === LANGUAGE PARSING ===
+        langs_data = event.get("languages") or event.get("language") or event.get("lang")
+        processed_langs = []
+
+        if isinstance(langs_data, dict):
+            for name, code in langs_data.items():
+                processed_langs.append((code, name))
+        elif isinstance(langs_data, list):
+            for code in langs_data:
+                processed_langs.append((code, code.upper()))
+        elif isinstance(langs_data, str):
+            parts = [x.strip() for x in langs_data.split(",")]
+            for p in parts:
+                processed_langs.append((p, p.upper()))
+        else:
+            processed_langs.append(("eng", "English"))
+
+        for lang_code, lang_name in processed_langs:
+            stream_url = (
+                f'{JIO_BASE_STREAM}?id={vid_id}&lang={lang_code}&{JIO_UID_PASS}'
+                f'|Cookie="{cookie_val}"&User-Agent="{JIO_UA}"&Referer="{JIO_REF}"'
+            )
+            display_name = f"JioHotstar: [{lang_name}] {title}"
+            lines.append(f'#EXTINF:-1 group-title="Live Events" tvg-logo="{logo}",{display_name}')
+            lines.append(stream_url)
+            count += 1
     
+    print(f"   --> Generated {count} JioHotstar lines.")
+
     return lines
 
 def get_auto_logo(channel_name):
@@ -190,173 +197,116 @@ def get_auto_logo(channel_name):
     return ""
 
 def parse_youtube_txt():
-    lines = []
-    if not os.path.exists(YOUTUBE_FILE): return []
-    try:
-        with open(YOUTUBE_FILE, "r", encoding="utf-8", errors="ignore") as f:
-            file_lines = f.readlines()
-        current_title, current_logo = "", ""
-        for line in file_lines:
-            line = line.strip()
-            if not line: continue
-            if line.lower().startswith("title"):
-                parts = line.split(":", 1)
-                if len(parts) > 1: current_title = parts[1].strip()
-            elif line.lower().startswith("logo"):
-                parts = line.split(":", 1)
-                if len(parts) > 1: current_logo = parts[1].strip()
-            elif line.lower().startswith("link") or line.startswith("http"):
-                url = line
-                if line.lower().startswith("link"):
-                    parts = line.split(":", 1)
-                    if len(parts) > 1: url = parts[1].strip()
-                if url.startswith("http") or url.startswith("rtmp"):
-                    if not current_title: current_title = "Temporary Channel"
-                    if not current_logo or len(current_logo) < 5:
-                        current_logo = get_auto_logo(current_title)
-                    lines.append(f'#EXTINF:-1 group-title="Temporary Channels" tvg-logo="{current_logo}",{current_title}')
-                    if "http" in url and "|" not in url: url += f"|User-Agent={UA_HEADER}"
-                    lines.append(url)
-                    current_title, current_logo = "", ""
-    except: pass
-    return lines
+    return render_m3u(load_youtube_txt(YOUTUBE_FILE), logo_for=get_auto_logo, user_agent=UA_HEADER)
+
+def channel_origin(entry, source):
+    # What the PREFERRED_COPY markers are matched against
+    return f"{source} {entry.attrs.get('tvg-id', '')} {entry.url}"
+
+def render_channel(entry, role):
+    new_group = "Backup" if role == "backup" else GROUP_CLASSIFIER.classify(entry.group, entry.name)
+    line = entry.extinf_with({"group-title": new_group}) if new_group != entry.group else entry.extinf
+    return entry.lines(line)
+
+# Pool worker: parses one chunk and does all the per-entry work up front
+# (filter, dedupe identity, both possible renderings), since the role is only
+# known after every source is in. Results are plain strings and tuples, which
+# come back from the worker much cheaper than M3UEntry objects.
+def _classify_chunk(task):
+    source, lines = task
+    deduper = new_deduper()
+    results = []
+    for entry in iter_entries(lines):
+        if not should_keep_channel(entry.group, entry.name):
+            results.append((entry.name, None))
+            continue
+        rendered = {role: render_channel(entry, role) for role in ("primary", "backup")}
+        results.append((entry.name, (deduper.identity(entry.name), channel_origin(entry, source), rendered)))
+    return results
+
+def filtered_entries(sources, workers):
+    # -> (name, None if filtered out else (identity or None, origin, item)) in
+    # source order; item is the entry itself, or its renderings from a worker.
+    # Pool chunks are mapped in order, so both paths give the same sequence.
+    if workers > 1:
+        tasks = [(source, chunk) for source, lines in sources for chunk in iter_entry_chunks(lines, CLASSIFY_CHUNK)]
+        if len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                for results in pool.map(_classify_chunk, tasks): yield from results
+            return
+    for source, lines in sources:
+        for entry in iter_entries(lines):
+            kept = should_keep_channel(entry.group, entry.name)
+            yield entry.name, (None, channel_origin(entry, source), entry.compact()) if kept else None  # held until resolve()
+
+def select_channels(sources, counts, workers=None):
+    # One parse pass over the (name, lines) sources feeds the deduper; output is
+    # emitted afterwards in source order, with parsed/kept/dropped/duplicates
+    # tallied in `counts`
+    deduper = new_deduper()
+    for name, record in filtered_entries(sources, CLASSIFY_WORKERS if workers is None else workers):
+        counts["parsed"] += 1
+        if record is None:
+            counts["dropped"] += 1
+            continue
+        identity, origin, item = record
+        deduper.add(item, name, origin, identity)
+
+    for item, role in deduper.resolve():
+        if role == "drop":
+            counts["dropped_sd"] += 1
+            continue
+        counts["duplicates" if role == "backup" else "kept"] += 1
+        yield from item[role] if isinstance(item, dict) else render_channel(item, role)
 
 def main():
     print("📥 Downloading Source Playlists...")
     ist_now = datetime.datetime.utcnow() + datetime.timedelta(hours=5, minutes=30)
-    final_lines = ["#EXTM3U"]
-    final_lines.append(f"# Last Updated: {ist_now.strftime('%Y-%m-%d %H:%M:%S IST')}")
-    final_lines.append("http://0.0.0.0")
 
-    # --- COMBINE POCKET + ZEE JOKER ---
-    source_lines = []
-    source_lines.extend(fetch_raw_lines(POCKET_URL))
-    source_lines.extend(fetch_raw_lines(ZEE_JOKER_URL))
+    # --- FETCH EVERY SOURCE AT ONCE ---
+    (pocket_lines, joker_lines, jio_lines, fancode_lines, sony_lines, zee_lines,
+     jio_worker_lines, youtube_live_lines) = run_fetch_jobs([
+        ("pocket", fetch_raw_lines, (POCKET_URL,), []),
+        ("joker", fetch_raw_lines, (ZEE_JOKER_URL,), []),
+        ("jiohotstar", fetch_jio_hotstar_live, (), []),
+        ("fancode", fetch_live_events, (FANCODE_URL, "Live Events"), []),
+        ("sony", fetch_live_events, (SONY_LIVE_URL, "Live Events"), []),
+        ("zee5", fetch_live_events, (ZEE_LIVE_URL, "Live Events"), []),
+        ("jio worker", fetch_live_events, (JIO_WORKER_URL, "Jio Live"), []),
+        ("youtube live", fetch_live_events, (YOUTUBE_LIVE_URL, "YouTube Live"), []),
+    ])
+    for name, lines in (("pocket", pocket_lines), ("joker", joker_lines), ("jiohotstar", jio_lines),
+                        ("fancode", fancode_lines), ("sony", sony_lines), ("zee5", zee_lines),
+                        ("jio worker", jio_worker_lines), ("youtube live", youtube_live_lines)):
+        metrics.record("sources", name, entries=metrics.count_entries(lines))
 
-    if not source_lines:
+    # --- COMBINE POCKET + ZEE JOKER ---
+    if not pocket_lines and not joker_lines:
         print("❌ No data found in sources.")
         sys.exit(1)
 
-    hd_channels_exist = set()
-    for line in source_lines:
-        if line.startswith("#EXTINF"):
-            _, name = get_group_and_name(line)
-            if "hd" in name.lower():
-                hd_channels_exist.add(get_clean_id(name))
-
-    seen_channels = set()
-    current_buffer = []
-    zee_tamil_count = 0
-
-    for line in source_lines:
-        line = line.strip()
-        if not line: continue
-        if line.startswith("#EXTM3U"): continue
-
-        if line.startswith("#EXTINF"):
-            if current_buffer:
-                final_lines.extend(current_buffer)
-            current_buffer = []
-
-            group, name = get_group_and_name(line)
-            clean_name = name.lower().strip()
-            
-            if not should_keep_channel(group, name):
-                current_buffer = [] 
-                continue
-
-            if "hd" not in clean_name:
-                base_id = get_clean_id(name)
-                if base_id in hd_channels_exist:
-                    current_buffer = []
-                    continue
-
-            exact_clean_id = re.sub(r'[^a-z0-9]', '', clean_name)
-            is_duplicate = False
-            if exact_clean_id in seen_channels:
-                is_duplicate = True
-            else:
-                seen_channels.add(exact_clean_id)
-
-            new_group = group 
-            
-            if "zee tamil hd" in clean_name:
-                zee_tamil_count += 1
-                if zee_tamil_count == 1:
-                    new_group = "Backup"
-                    is_duplicate = True
-                elif zee_tamil_count == 2:
-                    new_group = "Tamil HD"
-                    is_duplicate = False
-                else:
-                    new_group = "Backup"
-            elif is_duplicate:
-                new_group = "Backup"
-            else:
-                group_lower = group.lower()
-                if group_lower == "tamil": new_group = "Tamil Extra"
-                # DELETED: if group_lower == "local channels": new_group = "Tamil Extra" (Now deleted via BAD_KEYWORDS)
-                if "premium 24/7" in group_lower: new_group = "Tamil Extra"
-                if "astro go" in group_lower: new_group = "Tamil Extra"
-                if group_lower == "sports": new_group = "Sports Extra"
-                if "entertainment" in group_lower: new_group = "Others"
-                if "music" in group_lower: new_group = "Others"
-                
-                if "zee movie" in group_lower: new_group = "Others"
-                elif "movies" in group_lower: new_group = "Others"
-                
-                if "infotainment" in group_lower: new_group = "Infotainment HD"
-
-                if "news" in group_lower and "tamil" not in group_lower and "malayalam" not in group_lower:
-                    new_group = "English and Hindi News"
-
-                if new_group == "Tamil Extra" and "sports" in clean_name:
-                    new_group = "Sports Extra"
-                if "j movies" in clean_name or "raj digital plus" in clean_name: 
-                    new_group = "Tamil Extra"
-                if "rasi movies" in clean_name or "rasi hollywood" in clean_name: new_group = "Tamil Extra"
-                if "dd sports" in clean_name: new_group = "Sports Extra"
-                if any(target.lower() in clean_name for target in MOVE_TO_INFOTAINMENT_SD):
-                     new_group = "Infotainment SD"
-                if any(k in clean_name for k in INFOTAINMENT_KEYWORDS):
-                    if "hd" not in clean_name: new_group = "Infotainment SD"
-                for target in SPORTS_HD_KEEP:
-                    if target.lower() in clean_name: new_group = "Sports HD"; break
-                if any(target.lower() == clean_name for target in [x.lower() for x in MOVE_TO_TAMIL_NEWS]):
-                    new_group = "Tamil News"
-                if any(target.lower() == clean_name for target in [x.lower() for x in MOVE_TO_TAMIL_HD]): 
-                    new_group = "Tamil HD"
-
-            if new_group != group:
-                if 'group-title="' in line:
-                    line = re.sub(r'group-title="([^"]*)"', f'group-title="{new_group}"', line)
-                else:
-                    line = line.replace("#EXTINF:-1", f'#EXTINF:-1 group-title="{new_group}"')
-
-        current_buffer.append(line)
-
-        if not line.startswith("#"):
-            current_buffer[-1] = line
-            final_lines.extend(current_buffer)
-            current_buffer = []
-
-    if current_buffer:
-        final_lines.extend(current_buffer)
-
-    print("📥 Adding Live Events...")
-    final_lines.extend(fetch_jio_hotstar_live())
-    final_lines.extend(fetch_live_events(FANCODE_URL, "Live Events"))
-    final_lines.extend(fetch_live_events(SONY_LIVE_URL, "Live Events"))
-    final_lines.extend(fetch_live_events(ZEE_LIVE_URL, "Live Events"))
-    print("📥 Adding JioHotstar Worker...")
-    final_lines.extend(fetch_live_events(JIO_WORKER_URL, "Jio Live"))
-    print("📥 Adding YouTube Live...")
-    final_lines.extend(fetch_live_events(YOUTUBE_LIVE_URL, "YouTube Live"))
-    final_lines.extend(parse_youtube_txt())
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write("\n".join(final_lines))
-    
+    counts = {"parsed": 0, "kept": 0, "dropped": 0, "dropped_sd": 0, "duplicates": 0}
+
+    def output_lines():
+        # Streamed straight into the writer, no full copy of the playlist in memory
+        yield "#EXTM3U"
+        yield f"# Last Updated: {ist_now.strftime('%Y-%m-%d %H:%M:%S IST')}"
+        yield "http://0.0.0.0"
+        yield from select_channels([("pocket", pocket_lines), ("joker", joker_lines)], counts)
+        print("📥 Adding Live Events...")
+        yield from itertools.chain(jio_lines, fancode_lines, sony_lines, zee_lines)
+        print("📥 Adding JioHotstar Worker...")
+        yield from jio_worker_lines
+        print("📥 Adding YouTube Live...")
+        yield from youtube_live_lines
+        yield from parse_youtube_txt()
+
+    with metrics.timed_stage("write"): changed = write_if_changed(OUTPUT_FILE, apply_probe(output_lines()))
+    write_variants(OUTPUT_FILE, changed)
+    metrics.record("stages", "filter", **counts)
+
+    http_session.print_cache_stats()
+    metrics.write_metrics("pocket_playlist", http_cache=dict(http_session.STATS))
     print(f"\n✅ DONE. Saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+import gzip
+import io
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+import http_session
+import metrics
+from probe import is_probeable
+from build_manifest import file_digest
+from channel_index import clean_name_key
+from m3u_parser import iter_entries
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# The guide comes from EPG_SOURCE (URL or local file, .gz or plain XML) or,
+# by default, from the x-tvg-url in the template's #EXTM3U header. That one
+# is the LAN JioTV server, so it is skipped when it's a private address; to
+# use a LAN guide (running at home), name it in EPG_SOURCE.
+EPG_SOURCE = os.environ.get("EPG_SOURCE", "")
+EPG_OUTPUT = "epg.xml.gz"
+# Where players fetch the trimmed guide; goes into the playlist's x-tvg-url
+EPG_URL = os.environ.get("EPG_URL", "https://raw.githubusercontent.com/nkmisc88-jpg/NK--TV/main/epg.xml.gz")
+EPG_MAX_AGE = int(os.environ.get("EPG_MAX_AGE", 0))  # Seconds a trimmed guide is kept before rebuilding
+EPG_TIMEOUT = (5, 120)  # (connect, read) seconds
+TVG_URL_RE = re.compile(r'(?:x-tvg-url|url-tvg)="([^"]*)"')
+
+# ==========================================
+# CHANNEL IDS IN THE PLAYLIST
+# ==========================================
+def header_guide_url(playlist_file):
+    # x-tvg-url (first one if comma-separated) from the #EXTM3U header line
+    try:
+        with open(playlist_file, "r", encoding="utf-8") as f: match = TVG_URL_RE.search(f.readline())
+    except OSError: return ""
+    return match.group(1).split(",")[0].strip() if match else ""
+
+def playlist_header(playlist_file):
+    # "#EXTM3U" line of the playlist, pointing at the trimmed guide once one exists
+    output = os.path.join(os.path.dirname(playlist_file), EPG_OUTPUT)
+    return f'#EXTM3U x-tvg-url="{EPG_URL}"' if os.path.exists(output) else "#EXTM3U"
+
+# Players match guide channels by tvg-id and fall back to the channel name,
+# and most entries here carry no tvg-id, so both are collected.
+def playlist_guide_ids(playlist_file):
+    # -> ({tvg-id}, {clean_name_key(name)}) of the emitted channels
+    ids, names = set(), set()
+    with open(playlist_file, "r", encoding="utf-8") as f:
+        for entry in iter_entries(line.rstrip("\n") for line in f):
+            tvg_id = entry.attrs.get("tvg-id", "").strip()
+            if tvg_id: ids.add(tvg_id)
+            for name in (entry.name, entry.attrs.get("tvg-name", "")):
+                if clean_name_key(name): names.add(clean_name_key(name))
+    return ids, names
+
+# ==========================================
+# STREAMING GUIDE READER
+# ==========================================
+# The guide is read as a byte stream (gzip sniffed from the magic bytes, not
+# the name) and walked with iterparse; every top-level <channel>/<programme>
+# is handed out and then cleared from the root, so memory stays flat no
+# matter how many days the guide covers.
+def open_source(source):
+    if source.startswith(("http://", "https://")):
+        r = http_session.get_session().get(source, timeout=EPG_TIMEOUT, stream=True)
+        r.raise_for_status()
+        r.raw.decode_content = True  # undo Content-Encoding; a .gz body stays gzip
+        r.raw.auto_close = False  # BufferedReader reads past the end once more
+        stream = io.BufferedReader(r.raw)
+    else: stream = open(source, "rb")
+    return stream
+
+def decompressed(stream):
+    return gzip.GzipFile(fileobj=stream) if stream.peek(2)[:2] == b"\x1f\x8b" else stream
+
+def iter_guide(stream):
+    # -> ("root", <tv> element) once, then (tag, element) per top-level child
+    depth, root = 0, None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                root = elem
+                yield "root", elem
+            continue
+        depth -= 1
+        if depth == 1:
+            yield elem.tag, elem
+            root.clear()
+
+# ==========================================
+# TRIMMED GUIDE
+# ==========================================
+# Keeps the <channel> elements whose id is in `ids` or whose display-name is
+# in `names`, plus the <programme> elements of those channels, and writes
+# them straight into a gzip temp file (XMLTV lists channels first). The gzip header
+# carries no timestamp, so an unchanged guide produces identical bytes and
+# the file is only replaced when the content really changed.
+def filter_guide(source, ids, names=(), output=EPG_OUTPUT):
+    kept = set(ids)
+    counts = {"channels": 0, "programmes": 0, "kept_channels": 0, "kept_programmes": 0}
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    try:
+        with open_source(source) as source_stream, open(tmp_path, "wb") as raw, \
+                gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as gz:
+            out = io.TextIOWrapper(gz, encoding="utf-8", newline="\n")
+            out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            for tag, elem in iter_guide(decompressed(source_stream)):
+                if tag == "root":
+                    attrs = "".join(f" {k}={quoteattr(v)}" for k, v in elem.attrib.items())
+                    out.write(f"<{elem.tag}{attrs}>\n")
+                    continue
+                if tag == "channel":
+                    counts["channels"] += 1
+                    if elem.get("id") not in ids and not any(
+                            clean_name_key(n.text or "") in names for n in elem.iter("display-name")): continue
+                    kept.add(elem.get("id"))
+                    counts["kept_channels"] += 1
+                elif tag == "programme":
+                    counts["programmes"] += 1
+                    if elem.get("channel") not in kept: continue
+                    counts["kept_programmes"] += 1
+                else: continue
+                elem.tail = "\n"
+                out.write(ET.tostring(elem, encoding="unicode"))
+            out.write("</tv>\n")
+            out.flush()
+            out.detach()
+    except BaseException:
+        try: os.remove(tmp_path)
+        except OSError: pass
+        raise
+
+    changed = file_digest(tmp_path) != file_digest(output)
+    if changed: os.replace(tmp_path, output)
+    else:
+        os.remove(tmp_path)
+        os.utime(output)  # mtime = last check, for EPG_MAX_AGE
+    metrics.record("stages", "epg", written=changed, **counts)
+    return counts, changed
+
+def build_epg(playlist_file, source=None, output=None, guide_url=None):
+    # Trimmed guide next to the playlist; a missing or broken guide only warns.
+    # Source: argument, then EPG_SOURCE, then guide_url, then the playlist header;
+    # the last two only if they aren't a LAN address.
+    source = source or EPG_SOURCE
+    if not source:
+        source = guide_url or header_guide_url(playlist_file)
+        if source.startswith(("http://", "https://")) and not is_probeable(source):
+            print(f"⚠️ EPG: {source} is a LAN address, skipped (set EPG_SOURCE to use it).")
+            return None
+    output = output or os.path.join(os.path.dirname(playlist_file), EPG_OUTPUT)
+    if not source:
+        print("⚠️ EPG: no guide source, skipped.")
+        return None
+    ids, names = playlist_guide_ids(playlist_file)
+    try:
+        if time.time() - os.path.getmtime(output) < EPG_MAX_AGE: return None
+    except OSError: pass
+    print(f"📺 Trimming EPG for {len(ids)} channel ids / {len(names)} names...")
+    try:
+        with metrics.timed_stage("epg"): counts, changed = filter_guide(source, ids, names, output)
+    except Exception as e:
+        print(f"⚠️ EPG skipped ({source}): {e}")
+        return None
+    print(f"📺 EPG: channels {counts['kept_channels']}/{counts['channels']} | "
+          f"programmes {counts['kept_programmes']}/{counts['programmes']}"
+          f"{'' if changed else f' | {output} unchanged'}")
+    return counts
+
+if __name__ == "__main__":
+    # python epg.py playlist.m3u [guide.xml.gz|URL] [output]
+    build_epg(sys.argv[1], *sys.argv[2:4])
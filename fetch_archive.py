@@ -0,0 +1,179 @@
+import atexit
+import contextlib
+import hashlib
+import io
+import json
+import os
+import threading
+import zipfile
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# off    -> normal network access (default)
+# record -> every upstream response of the run is saved to FETCH_ARCHIVE
+# replay -> responses come from FETCH_ARCHIVE, nothing touches the network
+#
+#   FETCH_MODE=record python build.py
+#   FETCH_MODE=replay python build.py   (same run, offline, in seconds)
+FETCH_MODE = os.environ.get("FETCH_MODE", "off")
+FETCH_ARCHIVE = os.environ.get("FETCH_ARCHIVE", os.path.join(".cache", "fetch_archive.zip"))
+# Streamed bodies past this size (a big EPG, a live stream) are passed
+# through unrecorded instead of being buffered; replaying them fails
+RECORD_MAX_BYTES = int(os.environ.get("RECORD_MAX_BYTES", 16 << 20))
+CHUNK_SIZE = 64 * 1024
+# Re-encoded from the decoded body on replay, so they must not be replayed
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+# ==========================================
+# ARCHIVE
+# ==========================================
+# One zip (deflated) per run: index.json maps "METHOD url" to the status,
+# headers and body digest of the last response (or the error raised), and
+# every distinct body is stored once under bodies/<sha1>. Request headers
+# aren't part of the key, so rotating cookies and UAs still replay.
+# Inside headers_only() (the stream probes) only status and headers are
+# kept and the body is never read.
+_local = threading.local()
+
+@contextlib.contextmanager
+def headers_only():
+    _local.headers_only = True
+    try: yield
+    finally: _local.headers_only = False
+
+class FetchArchive:
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self.bodies = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        archive = cls(path)
+        with zipfile.ZipFile(path) as zf:
+            archive.index = json.loads(zf.read("index.json"))
+            for name in zf.namelist():
+                if name.startswith("bodies/"): archive.bodies[name[len("bodies/"):]] = zf.read(name)
+        return archive
+
+    def add(self, key, status=None, headers=None, body=b"", error=None):
+        digest = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            if error: self.index[key] = {"error": error}
+            else:
+                self.index[key] = {"status": status, "headers": headers, "body": digest}
+                self.bodies[digest] = body
+
+    def get(self, key):
+        with self._lock: record = self.index.get(key)
+        if record is None or "error" in record: return record, None
+        return record, self.bodies[record["body"]]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("index.json", json.dumps(self.index, indent=1, sort_keys=True))
+            for digest, body in sorted(self.bodies.items()): zf.writestr(f"bodies/{digest}", body)
+        os.replace(tmp_path, self.path)
+        print(f"📼 Recorded {len(self.index)} responses to {self.path}")
+
+# ==========================================
+# TRANSPORT ADAPTERS
+# ==========================================
+# Mounted on the shared session, so everything that goes through it
+# (conditional GETs, streamed bodies, probes, the EPG download) is covered.
+def _key(request):
+    return f"{request.method} {request.url}"
+
+def _replayable(adapter, request, status, headers, body):
+    # body: bytes, or a file-like object still being read from the network
+    raw = HTTPResponse(body=io.BytesIO(body) if isinstance(body, bytes) else body, headers=headers,
+                       status=status, preload_content=False, decode_content=False)
+    return adapter.build_response(request, raw)
+
+class _Resumed(io.RawIOBase):
+    # The part of a body already read, then the rest straight from the network
+    def __init__(self, head, raw):
+        self.head = io.BytesIO(head)
+        self.raw = raw
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self.head.readinto(b)
+        if n: return n
+        data = self.raw.read(len(b), decode_content=True)
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+def _read_capped(raw, limit):
+    # -> (body read so far, whether it ended within `limit` bytes)
+    body = bytearray()
+    while len(body) <= limit:
+        chunk = raw.read(CHUNK_SIZE, decode_content=True)
+        if not chunk: return bytes(body), True
+        body += chunk
+    return bytes(body), False
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, stream=False, **kwargs):
+        try:
+            r = super().send(request, stream=stream, **kwargs)
+            if getattr(_local, "headers_only", False):
+                headers = {k: v for k, v in r.headers.items() if k.lower() not in DROPPED_HEADERS}
+                self.archive.add(_key(request), r.status_code, headers)
+                return r
+            # Non-streamed bodies are read whole by requests anyway
+            body, complete = _read_capped(r.raw, RECORD_MAX_BYTES) if stream else (r.content, True)
+        except requests.RequestException as e:
+            self.archive.add(_key(request), error=f"{type(e).__name__}: {e}")
+            raise
+        headers = {k: v for k, v in r.headers.items() if k.lower() not in DROPPED_HEADERS}
+        if not complete:
+            self.archive.add(_key(request), error=f"body over {RECORD_MAX_BYTES} bytes, not recorded")
+            return _replayable(self, request, r.status_code, headers, _Resumed(body, r.raw))
+        if stream: r.close()
+        self.archive.add(_key(request), r.status_code, headers, body)
+        return _replayable(self, request, r.status_code, headers, body)
+
+class ReplayAdapter(HTTPAdapter):
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        record, body = self.archive.get(_key(request))
+        if record is None: raise requests.ConnectionError(f"not in {self.archive.path}: {_key(request)}")
+        if "error" in record: raise requests.ConnectionError(f"recorded error: {record['error']}")
+        return _replayable(self, request, record["status"], record["headers"], body)
+
+def install(session, pool_size, mode=None, path=None):
+    # -> True if the session now records or replays
+    mode, path = mode or FETCH_MODE, path or FETCH_ARCHIVE
+    if mode == "record":
+        archive = FetchArchive(path)
+        adapter = RecordingAdapter(archive, pool_connections=pool_size, pool_maxsize=pool_size)
+        atexit.register(archive.save)
+    elif mode == "replay":
+        archive = FetchArchive.load(path)
+        adapter = ReplayAdapter(archive)
+        print(f"📼 Replaying {len(archive.index)} responses from {path}")
+    else: return False
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return True
@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from source_cache import SOURCE_CACHE_TTL, load_source, save_source, format_age
+import metrics
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+MAX_WORKERS = 8
+FETCH_DEADLINE = 60  # Seconds for the WHOLE fetch stage, not per source
+
+# ==========================================
+# CONCURRENT FETCH STAGE
+# ==========================================
+# Each job is (name, func, args, default). All jobs start at once and the
+# results come back in the same order as the jobs list, so the playlist
+# layout never depends on which mirror answered first. Fetch helpers raise on
+# failure; a job that raises or is still running when the deadline hits gets
+# its last good result from source_cache (if younger than the TTL), otherwise
+# its default.
+def _cache_key(func, args):
+    return f"{func.__module__}.{func.__name__}{args!r}"
+
+def run_fetch_jobs(jobs, deadline=FETCH_DEADLINE, max_workers=MAX_WORKERS, ttl=SOURCE_CACHE_TTL):
+    timings = {}
+
+    def timed(name, func, args):
+        metrics.set_source(name)
+        start = time.monotonic()
+        try: return func(*args)
+        finally:
+            timings[name] = time.monotonic() - start
+            metrics.set_source(None)
+
+    stage_start = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [pool.submit(timed, name, func, args) for name, func, args, _ in jobs]
+    wait(futures, timeout=deadline)
+    # Don't block on stragglers; their own request timeout will end them
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    print("⏱️ Fetch timings:")
+    for (name, func, args, default), fut in zip(jobs, futures):
+        key = _cache_key(func, args)
+        if fut.done() and not fut.cancelled() and fut.exception() is None:
+            print(f"   {name}: {timings[name]:.2f}s")
+            metrics.record("sources", name, seconds=round(timings[name], 4), status="ok")
+            save_source(key, fut.result())
+            results.append(fut.result())
+            continue
+
+        if not fut.done(): problem = f"TIMEOUT (> {deadline}s)"
+        elif fut.cancelled(): problem = "CANCELLED"
+        else: problem = f"FAILED after {timings.get(name, 0):.2f}s ({fut.exception()})"
+        cached, age = load_source(key, ttl)
+        metrics.record("sources", name, seconds=round(timings.get(name, deadline), 4), error=problem)
+        if cached is not None:
+            print(f"   {name}: {problem} -> serving cached copy ({format_age(age)} old)")
+            metrics.record("sources", name, status="cached", cache_age=round(age))
+            results.append(cached)
+        else:
+            print(f"   {name}: {problem} -> no cached copy, skipped")
+            metrics.record("sources", name, status="failed")
+            results.append(default)
+    print(f"   Total fetch stage: {time.monotonic() - stage_start:.2f}s")
+    metrics.record("stages", "fetch", seconds=round(time.monotonic() - stage_start, 4))
+    return results
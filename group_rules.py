@@ -0,0 +1,75 @@
+import re
+
+# ==========================================
+# KEYWORD AUTOMATON
+# ==========================================
+# All substring keywords of a rule table folded into ONE compiled regex, so
+# finding every keyword in a name is a single scan whose cost depends on the
+# name length, not on how many keywords exist. The lookahead makes matches
+# overlap ("zee movies" hits both "zee movie" and "movies"); keywords that are
+# a prefix of a longer one at the same position are added back explicitly.
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.keywords = sorted({k.lower() for k in keywords if k}, key=len, reverse=True)
+        self.implied = {k: {p for p in self.keywords if k.startswith(p)} for k in self.keywords}
+        alternation = "|".join(re.escape(k) for k in self.keywords)
+        self.pattern = re.compile(f"(?=({alternation}))") if self.keywords else None
+
+    def find_all(self, text):
+        found = set()
+        if self.pattern is None: return found
+        for kw in self.pattern.findall(text):
+            found |= self.implied[kw]
+        return found
+
+    def search(self, text):
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+# ==========================================
+# RULE TABLE COMPILER
+# ==========================================
+# A rule is a dict with a target group ("to") and one primary condition:
+#   group_is / name_is    -> exact match on the lowercased group / name
+#   group_has / name_has  -> any keyword is a substring of it
+# plus optional guards:
+#   unless_group_has / unless_name_has -> none of these keywords appear
+#   if_group_so_far                    -> the result of the earlier rules
+# Rules are applied in table order and a later match overrides an earlier one;
+# classify() returns the original group when nothing fires.
+FIELDS = ("group", "name")
+
+class GroupClassifier:
+    def __init__(self, rules):
+        self.rules = []
+        self.exact = {field: {} for field in FIELDS}
+        self.keyword_rules = {field: {} for field in FIELDS}
+        keywords = {field: set() for field in FIELDS}
+        for idx, rule in enumerate(rules):
+            rule = {k: ([x.lower() for x in v] if isinstance(v, list) else v) for k, v in rule.items()}
+            self.rules.append(rule)
+            for field in FIELDS:
+                for value in rule.get(f"{field}_is", []):
+                    self.exact[field].setdefault(value, []).append(idx)
+                for kw in rule.get(f"{field}_has", []):
+                    keywords[field].add(kw)
+                    self.keyword_rules[field].setdefault(kw, []).append(idx)
+                keywords[field].update(rule.get(f"unless_{field}_has", []))
+        self.matchers = {field: KeywordMatcher(keywords[field]) for field in FIELDS}
+
+    def classify(self, group, name):
+        group_lower, name_lower = group.lower(), name.lower().strip()
+        found_group = self.matchers["group"].find_all(group_lower)
+        found_name = self.matchers["name"].find_all(name_lower)
+        candidates = set(self.exact["group"].get(group_lower, ()))
+        candidates.update(self.exact["name"].get(name_lower, ()))
+        for kw in found_group: candidates.update(self.keyword_rules["group"].get(kw, ()))
+        for kw in found_name: candidates.update(self.keyword_rules["name"].get(kw, ()))
+
+        new_group = group
+        for idx in sorted(candidates):
+            rule = self.rules[idx]
+            if any(k in found_group for k in rule.get("unless_group_has", ())): continue
+            if any(k in found_name for k in rule.get("unless_name_has", ())): continue
+            if "if_group_so_far" in rule and new_group != rule["if_group_so_far"]: continue
+            new_group = rule["to"]
+        return new_group
@@ -0,0 +1,301 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+import metrics
+import fetch_archive
+from m3u_parser import iter_entries, iter_text_lines, skip_preamble
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+CACHE_DIR = os.path.join(".cache", "http")
+POOL_SIZE = 16
+CHUNK_SIZE = 1 << 16
+
+# ==========================================
+# SHARED POOLED SESSION
+# ==========================================
+# One keep-alive session for every script, so the many raw.githubusercontent.com
+# sources reuse the same TCP+TLS connections instead of opening one each.
+_session = None
+_archived = False  # recording or replaying, see fetch_archive.py
+_lock = threading.Lock()
+STATS = {"hit": 0, "miss": 0, "304": 0, "shared": 0}
+
+def get_session():
+    global _session, _archived
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _archived = fetch_archive.install(_session, POOL_SIZE)
+        return _session
+
+def _count(kind, size=0):
+    with _lock: STATS[kind] += 1
+    metrics.record("sources", metrics.current_source() or "other", requests=1, bytes=size, **{f"http_{kind}": 1})
+
+class CachedResponse:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self._text = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            encoding = get_encoding_from_headers(self.headers) or "utf-8"
+            self._text = self.content.decode(encoding, errors="replace")
+        return self._text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+# get(..., stream=True) hands back a StreamedResponse instead: the body is
+# decoded and split into lines while it downloads, the non-M3U preamble is
+# skipped, and the raw bytes go to the disk cache rather than memory. lines()
+# and entries() are memoized (and thread-safe), so builders sharing the
+# response parse it once. `digest` identifies the body: for a body served
+# from the disk cache it's known up front, so a section keyed on it is
+# looked up without parsing anything; otherwise reading it parses the body.
+def _body_digest(h):
+    return hashlib.sha1(h.digest()).hexdigest()
+
+class StreamedResponse:
+    def __init__(self, status_code, chunks, headers, digest=None):
+        self.status_code = status_code
+        self.headers = headers
+        self._digest = digest
+        self._chunks = chunks
+        self._lock = threading.Lock()
+        self._lines = None
+        self._entries = None
+        self._error = None
+
+    def _consume(self):
+        if self._error: raise self._error
+        h = hashlib.sha1()
+
+        def hashed():
+            for chunk in self._chunks:
+                h.update(chunk)
+                yield chunk
+        encoding = get_encoding_from_headers(self.headers) or "utf-8"
+        try: yield from skip_preamble(iter_text_lines(hashed(), encoding))
+        except Exception as e:
+            self._error = e
+            raise
+        self._digest = _body_digest(h)
+
+    @property
+    def digest(self):
+        if self._digest is None: self.entries()
+        return self._digest
+
+    def lines(self):
+        with self._lock:
+            if self._lines is None:
+                if self._entries is not None: self._lines = [line for entry in self._entries for line in entry.lines()]
+                else: self._lines = list(self._consume())
+            return self._lines
+
+    def entries(self):
+        with self._lock:
+            if self._entries is None:
+                self._entries = list(iter_entries(self._lines if self._lines is not None else self._consume()))
+            return self._entries
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+# ==========================================
+# ON-DISK VALIDATOR CACHE
+# ==========================================
+def _cache_paths(url):
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, key + ".json"), os.path.join(CACHE_DIR, key + ".body")
+
+def _load_cached(url, stream=False):
+    # Streaming callers get the body as a chunk iterator over the cached file.
+    # Recorded and replayed runs skip the cache so every upstream is a full GET.
+    if _archived: return None, None
+    meta_path, body_path = _cache_paths(url)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f: meta = json.load(f)
+        if stream:
+            if not os.path.exists(body_path): return None, None
+            return meta, _file_chunks(body_path)
+        with open(body_path, "rb") as f: body = f.read()
+        return meta, body
+    except (OSError, ValueError): return None, None
+
+def _file_chunks(path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""): yield chunk
+
+def _write_atomic(path, data, mode):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, mode) as f: f.write(data)
+    os.replace(tmp_path, path)
+
+def _max_age(headers):
+    match = re.search(r'max-age=(\d+)', headers.get("Cache-Control", ""))
+    return int(match.group(1)) if match else 0
+
+def _store(url, meta, body=None):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        meta_path, body_path = _cache_paths(url)
+        if body is not None: _write_atomic(body_path, body, "wb")
+        _write_atomic(meta_path, json.dumps(meta), "w")
+    except OSError as e:
+        print(f"⚠️ Could not write HTTP cache for {url}: {e}")
+
+# ==========================================
+# SHARED RESPONSES (ONE-PROCESS BUILDS)
+# ==========================================
+# build.py renders several playlists in one process. With sharing on, each
+# URL is requested once per run and later get() calls for it (from any
+# builder) return the same response object, or re-raise the same error, so a
+# failing upstream isn't waited on twice either. The long-running serve mode
+# keeps sharing on between cycles and calls expire_shared() before each one.
+_shared = None  # (url, stream) -> (fetched at, response or exception); None when sharing is off
+_url_locks = {}
+
+def share_responses(enabled=True):
+    global _shared
+    with _lock:
+        _shared = {} if enabled else None
+        _url_locks.clear()
+
+def expire_shared(max_age):
+    # Drops errors (including streamed bodies that broke off mid-download)
+    # and every response older than max_age(url) seconds; the rest stay warm
+    now = time.time()
+    with _lock:
+        if _shared is None: return 0
+        stale = [key for key, (fetched, result) in _shared.items()
+                 if isinstance(result, Exception) or getattr(result, "_error", None)
+                 or now - fetched >= max_age(key[0])]
+        for key in stale: del _shared[key]
+        return len(stale)
+
+def get(url, headers=None, timeout=15, stream=False):
+    if _shared is None: return _conditional_get(url, headers, timeout, stream)
+    key = (url, stream)
+    with _lock: url_lock = _url_locks.setdefault(key, threading.Lock())
+    with url_lock:
+        if key in _shared:
+            _count("shared")
+            result = _shared[key][1]
+            if isinstance(result, Exception): raise result
+            return result
+        try: result = _conditional_get(url, headers, timeout, stream)
+        except Exception as e:
+            _shared[key] = (time.time(), e)
+            raise
+        _shared[key] = (time.time(), result)
+        return result
+
+# ==========================================
+# CONDITIONAL GET
+# ==========================================
+# Drop-in for requests.get(). Bodies still fresh per Cache-Control are served
+# without touching the network ("hit"), stale ones are revalidated with
+# If-None-Match / If-Modified-Since ("304" when unchanged) and everything else
+# is a full download ("miss"). Network errors propagate like requests.get().
+def _conditional_get(url, headers=None, timeout=15, stream=False):
+    respond = StreamedResponse if stream else CachedResponse
+    session = get_session()
+    meta, body = _load_cached(url, stream)
+    if meta and meta.get("expires", 0) > time.time():
+        _count("hit")
+        return _cached_response(respond, body, meta)
+
+    req_headers = dict(headers or {})
+    if meta:
+        if meta.get("etag"): req_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"): req_headers["If-Modified-Since"] = meta["last_modified"]
+
+    r = session.get(url, headers=req_headers, timeout=timeout, stream=stream)
+    if r.status_code == 304 and meta:
+        r.close()
+        _count("304")
+        meta["expires"] = time.time() + _max_age(r.headers)
+        _store(url, meta)
+        return _cached_response(respond, body, meta)
+
+    resp_headers = {"Content-Type": r.headers.get("Content-Type", "")}
+    new_meta = None
+    if r.status_code == 200 and not _archived and (r.headers.get("ETag") or r.headers.get("Last-Modified") or _max_age(r.headers)):
+        new_meta = {
+            "url": url,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "expires": time.time() + _max_age(r.headers),
+            "headers": resp_headers,
+        }
+    if stream:
+        if r.status_code != 200:
+            r.close()
+            return StreamedResponse(r.status_code, iter(()), resp_headers)
+        return StreamedResponse(200, _download(url, r, new_meta), resp_headers)
+    if r.status_code == 200:
+        _count("miss", len(r.content))
+        if new_meta: _store(url, new_meta, r.content)
+    return CachedResponse(r.status_code, r.content, resp_headers)
+
+def _cached_response(respond, body, meta):
+    if respond is StreamedResponse: return StreamedResponse(200, body, meta["headers"], meta.get("digest"))
+    return CachedResponse(200, body, meta["headers"])
+
+def _download(url, r, meta):
+    # Yields the body as it arrives; with validators it's also written to a
+    # temp cache file that only replaces the old body once complete, its
+    # digest recorded next to the validators
+    _, body_path = _cache_paths(url)
+    tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+    size, out, h = 0, None, hashlib.sha1()
+    try:
+        if meta:
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                out = open(tmp_path, "wb")
+            except OSError as e: print(f"⚠️ Could not write HTTP cache for {url}: {e}")
+        for chunk in r.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if out:
+                out.write(chunk)
+                h.update(chunk)
+            yield chunk
+        if out:
+            out.close()
+            os.replace(tmp_path, body_path)
+            out = None
+            meta["digest"] = _body_digest(h)
+            _store(url, meta)
+        _count("miss", size)
+    finally:
+        r.close()
+        if out:
+            out.close()
+            try: os.remove(tmp_path)
+            except OSError: pass
+
+def print_cache_stats():
+    shared = f" | shared {STATS['shared']}" if STATS["shared"] else ""
+    print(f"🌐 HTTP cache: hit {STATS['hit']} | miss {STATS['miss']} | 304 {STATS['304']}{shared}")
@@ -0,0 +1,208 @@
+import codecs
+import re
+from sys import intern
+
+# ==========================================
+# STREAMING M3U PARSER
+# ==========================================
+# One parser for every script. Feed it any iterable of lines (a file object,
+# a list, a response stream; str or bytes) and it yields one M3UEntry per
+# channel as soon as that channel's URL line arrives, so a multi-MB upstream
+# is handled in a single pass without building intermediate lists.
+#
+# Tag lines (#KODIPROP, #EXTVLCOPT, #EXTHTTP, plain comments) are attached to
+# the channel they sit next to, keeping their position before or after the
+# #EXTINF line. Non-tag lines that arrive without a pending #EXTINF (HTML
+# wrappers, banners, orphan URLs) are discarded.
+#
+# Entries are compact records: __slots__ instead of a per-object dict, tag
+# lines kept in tuples (one shared empty tuple for the common case), and the
+# attribute keys, low-cardinality values (group names, languages, group
+# logos), repeated tag lines and header suffixes interned, so 100k channels
+# share one copy of "group-title", "Tamil HD", the clearkey KODIPROP, the
+# User-Agent suffix... The #EXTINF line is tokenized exactly once, here.
+# Records held for the whole run call compact(), which drops the verbatim
+# line when rendering the parsed parts gives it back; parsing itself skips
+# that check, so a record that's used and let go costs no extra render.
+ATTR_RE = re.compile(r'([A-Za-z0-9_-]+)="([^"]*)"')
+EXTINF_RE = re.compile(r'#EXTINF:\s*(-?[0-9.]+)((?:\s*[A-Za-z0-9_-]+="[^"]*")*)\s*,(.*)')
+INTERNED_VALUES = frozenset(("group-title", "group-logo", "tvg-language", "tvg-country", "tvg-type"))
+UNIQUE_TAGS = ("#EXTHTTP",)  # per-channel cookies; everything else but license keys repeats
+DURATION_RE = re.compile(r'^(#EXTINF:\s*-?[0-9.]*)')
+_attr_res = {}  # attribute key -> compiled key="..." pattern, for malformed lines
+
+class M3UEntry:
+    __slots__ = ("_extinf", "pre", "post", "url", "headers", "duration", "attrs", "name", "well_formed")
+
+    def __init__(self, extinf, pre=(), post=(), url="", headers=""):
+        self.pre = tuple(pre)    # tag lines before #EXTINF
+        self.post = tuple(post)  # tag lines between #EXTINF and the URL
+        self.url = url           # stream URL without the |header suffix
+        self.headers = headers   # "User-Agent=...&Referer=..." or ""
+        self.duration, self.attrs, self.name, self.well_formed = tokenize_extinf(extinf)
+        self._extinf = extinf
+
+    def compact(self):
+        if self._extinf is not None and self.well_formed and \
+                render_extinf(self.duration, self.attrs, self.name) == self._extinf: self._extinf = None
+        return self
+
+    @property
+    def extinf(self):
+        return self._extinf or render_extinf(self.duration, self.attrs, self.name)
+
+    @property
+    def props(self):
+        return [*self.pre, *self.post]
+
+    @property
+    def group(self):
+        return self.attrs.get("group-title", "").strip()
+
+    @property
+    def url_line(self):
+        return f"{self.url}|{self.headers}" if self.headers else self.url
+
+    def extinf_with(self, changes):
+        # Re-serialize the #EXTINF line with some attributes replaced/added
+        if self.well_formed:
+            attrs = dict(self.attrs)
+            attrs.update(changes)
+            return render_extinf(self.duration, attrs, self.name)
+        line = self.extinf
+        for key, value in changes.items():
+            if key not in _attr_res: _attr_res[key] = re.compile(re.escape(key) + r'="[^"]*"', re.IGNORECASE)
+            new_line, found = _attr_res[key].subn(lambda m: f'{key}="{value}"', line, count=1)
+            if not found: new_line = DURATION_RE.sub(lambda m: f'{m.group(1)} {key}="{value}"', line, count=1)
+            line = new_line
+        return line
+
+    def lines(self, extinf=None):
+        return [*self.pre, extinf or self.extinf, *self.post, self.url_line]
+
+# ==========================================
+# EXTINF ATTRIBUTE TOKENIZER
+# ==========================================
+# Matches '#EXTINF:-1 key="v, w" other="x",Title' with one precompiled pattern
+# and returns every attribute at the same time:
+# ("-1", {"key": "v, w", "other": "x"}, "Title", True). The last flag says the
+# line was well-formed, i.e. it can be rebuilt from its parts without losing
+# anything.
+_keys = {}  # attribute key as written -> interned lowercase key
+
+def _intern_attrs(pairs):
+    attrs = {}
+    for k, v in pairs:
+        key = _keys.get(k)
+        if key is None: key = _keys[k] = intern(k.lower())
+        attrs[key] = intern(v) if key in INTERNED_VALUES else v
+    return attrs
+
+def tokenize_extinf(line):
+    m = EXTINF_RE.match(line)
+    if m:
+        return intern(m.group(1)), _intern_attrs(ATTR_RE.findall(m.group(2))), m.group(3).strip(), True
+    return _tokenize_loose(line)
+
+def _tokenize_loose(line):
+    # Malformed lines (unquoted values, stray quotes): split the title at the
+    # first comma outside quotes and pick up whatever attributes are readable.
+    body = line[len("#EXTINF:"):] if line.startswith("#EXTINF:") else line
+    in_quotes = False
+    comma = -1
+    for i, ch in enumerate(body):
+        if ch == '"': in_quotes = not in_quotes
+        elif ch == "," and not in_quotes: comma = i; break
+    if comma == -1: comma = body.rfind(",")  # unbalanced quotes, fall back to the last comma
+    head, name = (body[:comma], body[comma + 1:]) if comma != -1 else (body, "")
+    head = head.strip()
+    duration = head.split(" ", 1)[0] if head else ""
+    return intern(duration), _intern_attrs(ATTR_RE.findall(head)), name.strip(), False
+
+def render_extinf(duration, attrs, name):
+    return "#EXTINF:" + duration + "".join([f' {k}="{v}"' for k, v in attrs.items()]) + "," + name
+
+def iter_entries(lines):
+    pending = []
+    extinf = None
+    post = []
+    for line in lines:
+        if isinstance(line, bytes): line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line or line.startswith("#EXTM3U"): continue
+        if line.startswith("#EXTINF"):
+            if extinf is not None: pending = []  # previous #EXTINF had no URL
+            extinf = line; post = []
+        elif line.startswith("#"):
+            if not line.startswith(UNIQUE_TAGS) and "license_key" not in line: line = intern(line)
+            (post if extinf is not None else pending).append(line)
+        elif extinf is not None:
+            url, _, headers = line.partition("|")
+            headers = headers.strip()
+            if "cookie" not in headers.lower(): headers = intern(headers)
+            yield M3UEntry(extinf, pending, post, url.strip(), headers)
+            pending = []; extinf = None; post = []
+        else:
+            pending = []  # junk / orphan URL, drop its tags with it
+
+# ==========================================
+# LINE STREAMS
+# ==========================================
+# iter_text_lines() turns a byte stream (response chunks, a file read in
+# blocks) into text lines while the bytes arrive, with the same line breaks
+# as str.splitlines(), so parsing overlaps the download. skip_preamble()
+# drops whatever sits between the #EXTM3U header and the first channel tag,
+# like the HTML redirect stub wrapped around the Pocket list.
+ENTRY_TAGS = ("#EXTINF", "#KODIPROP", "#EXTVLCOPT", "#EXTHTTP")
+LINE_BREAKS = ("\n", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+def iter_text_lines(chunks, encoding="utf-8"):
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    tail = ""
+    for chunk in chunks:
+        text = tail + decoder.decode(chunk)
+        lines = text.splitlines()
+        tail = ""
+        # The last line is unfinished, or ends in "\r" that a "\n" may still follow
+        if lines and text.endswith("\r"): tail = lines.pop() + "\r"
+        elif lines and not text.endswith(LINE_BREAKS): tail = lines.pop()
+        yield from lines
+    yield from (tail + decoder.decode(b"", final=True)).splitlines()
+
+def skip_preamble(lines):
+    lines = iter(lines)
+    for line in lines:
+        if line.startswith("#EXTM3U"): yield line
+        elif line.lstrip().startswith(ENTRY_TAGS):
+            yield line
+            break
+    yield from lines
+
+def iter_entry_chunks(lines, size):
+    # Slices of `lines` holding about `size` entries each, cut right after a
+    # URL line where iter_entries() carries no state, so parsing the slices
+    # separately gives the same entries as parsing the whole list
+    start, urls = 0, 0
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line or line.startswith("#"): continue
+        urls += 1
+        if urls == size:
+            yield lines[start:i + 1]
+            start, urls = i + 1, 0
+    if start < len(lines): yield lines[start:]
+
+# ==========================================
+# CRAMMED LINES
+# ==========================================
+# Hand-edited lists (drm.txt) often have "#KODIPROP:... #KODIPROP:...
+# #EXTINF:-1 ...,Title https://..." on one line. This splits every line at
+# whitespace that is followed by a tag or a stream URL, so iter_entries()
+# sees one tag per line. Quoted attribute values and |header suffixes are
+# never split because their URLs follow '"' or '=', not whitespace.
+CRAMMED_SPLIT_RE = re.compile(r'\s+(?=#(?:EXTINF|KODIPROP|EXTVLCOPT|EXTHTTP)\b|(?:https?|rtmp)://)')
+
+def split_crammed_lines(lines):
+    for line in lines:
+        if isinstance(line, bytes): line = line.decode("utf-8", errors="replace")
+        yield from CRAMMED_SPLIT_RE.split(line.strip())
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(".cache", "metrics"))
+# Optional node_exporter textfile collector target, e.g. /var/lib/node_exporter/nktv.prom
+PROMETHEUS_FILE = os.environ.get("METRICS_PROM_FILE", "")
+
+# ==========================================
+# RUN METRICS
+# ==========================================
+# Counters for one run, grouped per source ("backup", "pocket", ...) and per
+# stage ("fetch", "dedupe", "write", ...). Numbers passed to record() are
+# added up, anything else (e.g. a status) is stored as is. write_metrics()
+# dumps everything to <METRICS_DIR>/<run>.json at the end of the run; set
+# METRICS_PROM_FILE to also get a Prometheus textfile per run: x.prom ->
+# x.<run>.prom, so builders sharing a process don't overwrite each other.
+_lock = threading.Lock()
+_local = threading.local()
+_started = time.time()
+_data = {"sources": {}, "stages": {}}
+
+def record(kind, name, **values):
+    with _lock:
+        bucket = _data[kind].setdefault(name, {})
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool): bucket[key] = bucket.get(key, 0) + value
+            else: bucket[key] = value
+
+@contextmanager
+def timed_stage(name):
+    start = time.monotonic()
+    try: yield
+    finally: record("stages", name, seconds=round(time.monotonic() - start, 4))
+
+# The fetch pool tags each worker thread with its job name, so helpers deep
+# in the call chain (http_session byte counts) know which source they serve
+def set_source(name):
+    _local.source = name
+
+def current_source():
+    return getattr(_local, "source", None)
+
+def count_entries(lines):
+    return sum(1 for line in lines if line.startswith("#EXTINF"))
+
+def _prometheus_lines(run, snapshot):
+    out = []
+    for kind, label in (("sources", "source"), ("stages", "stage")):
+        for name, values in sorted(snapshot[kind].items()):
+            for key, value in sorted(values.items()):
+                if not isinstance(value, (int, float)) or isinstance(value, bool): continue
+                out.append(f'nktv_{label}_{key}{{run="{run}",{label}="{name}"}} {value}')
+    out.append(f'nktv_run_seconds{{run="{run}"}} {snapshot["total_seconds"]}')
+    out.append(f'nktv_run_timestamp{{run="{run}"}} {int(snapshot["finished"])}')
+    return out
+
+def prometheus_path(run):
+    stem, ext = os.path.splitext(PROMETHEUS_FILE)
+    return f"{stem}.{run}{ext or '.prom'}"
+
+def reset():
+    global _started
+    with _lock:
+        _started = time.time()
+        for bucket in _data.values(): bucket.clear()
+
+def write_metrics(run, **extra):
+    # Also starts a fresh run, so builders sharing a process don't mix counters
+    with _lock:
+        snapshot = json.loads(json.dumps(_data))
+    snapshot.update(extra)
+    snapshot["started"] = _started
+    reset()
+    snapshot["run"] = run
+    snapshot["finished"] = time.time()
+    snapshot["total_seconds"] = round(snapshot["finished"] - snapshot["started"], 3)
+
+    path = os.path.join(METRICS_DIR, f"{run}.json")
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f: json.dump(snapshot, f, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+        if PROMETHEUS_FILE:
+            prom_path = prometheus_path(run)
+            with open(prom_path + ".tmp", "w", encoding="utf-8") as f: f.write("\n".join(_prometheus_lines(run, snapshot)) + "\n")
+            os.replace(prom_path + ".tmp", prom_path)
+    except OSError as e:
+        print(f"⚠️ Could not write metrics: {e}")
+        return snapshot
+
+    slowest = sorted(snapshot["sources"].items(), key=lambda kv: -kv[1].get("seconds", 0))[:3]
+    summary = ", ".join(f"{name} {values.get('seconds', 0):.2f}s" for name, values in slowest)
+    print(f"📊 Metrics: {snapshot['total_seconds']:.2f}s total | slowest sources: {summary or 'none'} -> {path}")
+    return snapshot
@@ -0,0 +1,107 @@
+import gzip
+import os
+import re
+import time
+import metrics
+from build_manifest import read_lines
+from m3u_parser import iter_entries
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# Next to every published playlist:
+#   <name>.m3u.gz                  -> the same playlist, gzip (always)
+#   <SHARD_DIR>/<name>/<group>.m3u -> one playlist per group-title (SHARD_OUTPUTS=1)
+#   <name>_groups.m3u              -> index playlist pointing at the shards
+# Shard links in the index are relative to it unless SHARD_BASE_URL is set
+# (e.g. the raw.githubusercontent.com folder the playlists are served from).
+SHARD_OUTPUTS = os.environ.get("SHARD_OUTPUTS", "0") == "1"
+SHARD_DIR = "groups"
+SHARD_BASE_URL = os.environ.get("SHARD_BASE_URL", "")
+INDEX_GROUP = "Groups"
+SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+def group_slug(group):
+    return SLUG_RE.sub("-", group.lower()).strip("-") or "ungrouped"
+
+def variant_paths(path):
+    # -> (gzip copy, shard folder, index playlist)
+    stem = os.path.splitext(path)[0]
+    return f"{path}.gz", os.path.join(os.path.dirname(path), SHARD_DIR, os.path.basename(stem)), f"{stem}_groups.m3u"
+
+def format_size(size):
+    return f"{size / 1024:.1f} KB" if size < 1 << 20 else f"{size / (1 << 20):.2f} MB"
+
+# ==========================================
+# ONE PASS OVER THE WRITTEN PLAYLIST
+# ==========================================
+# Reads the playlist back line by line; every line goes into the gzip copy
+# and, with sharding on, the same stream is parsed and each channel filed
+# under its group. Everything is written to temp files that replace the old
+# ones at the end, and shards of groups that disappeared are removed. The
+# gzip header carries no timestamp, so an identical playlist gives identical
+# bytes. Nothing is redone when the playlist didn't change and the variants
+# are already there.
+def _gzip_tee(lines, gz):
+    first = True
+    for line in lines:
+        gz.write(line.encode("utf-8") if first else b"\n" + line.encode("utf-8"))
+        first = False
+        yield line
+
+def write_variants(path, changed=True, shards=None):
+    shards = SHARD_OUTPUTS if shards is None else shards
+    gz_path, shard_dir, index_path = variant_paths(path)
+    if not changed and os.path.exists(gz_path) and (not shards or os.path.exists(index_path)): return None
+
+    start = time.monotonic()
+    tmp = f".{os.getpid()}.tmp"
+    groups = {}  # slug -> [group-title, entries, open temp file]
+    try:
+        with open(gz_path + tmp, "wb") as raw, gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as gz:
+            lines = _gzip_tee(read_lines(path), gz)
+            if not shards:
+                for _ in lines: pass
+            else:
+                os.makedirs(shard_dir, exist_ok=True)
+                for entry in iter_entries(lines):
+                    slug = group_slug(entry.group)
+                    if slug not in groups:
+                        f = open(os.path.join(shard_dir, slug + ".m3u" + tmp), "w", encoding="utf-8")
+                        f.write("#EXTM3U")
+                        groups[slug] = [entry.group, 0, f]
+                    groups[slug][1] += 1
+                    groups[slug][2].write("\n" + "\n".join(entry.lines()))
+    except BaseException:
+        for name in [gz_path + tmp] + [os.path.join(shard_dir, slug + ".m3u" + tmp) for slug in groups]:
+            try: os.remove(name)
+            except OSError: pass
+        raise
+    finally:
+        for _, _, f in groups.values(): f.close()
+
+    os.replace(gz_path + tmp, gz_path)
+    sizes = {"bytes": os.path.getsize(path), "gzip_bytes": os.path.getsize(gz_path)}
+    if shards:
+        for slug in groups: os.replace(os.path.join(shard_dir, slug + ".m3u" + tmp), os.path.join(shard_dir, slug + ".m3u"))
+        for name in os.listdir(shard_dir):
+            if name.endswith(".m3u") and name[:-4] not in groups: os.remove(os.path.join(shard_dir, name))
+        base = SHARD_BASE_URL.rstrip("/") + "/" if SHARD_BASE_URL else ""
+        rel_dir = os.path.relpath(shard_dir, os.path.dirname(index_path) or ".").replace(os.sep, "/")
+        with open(index_path + tmp, "w", encoding="utf-8") as f:
+            f.write("#EXTM3U")
+            for slug, (group, count, _) in groups.items():
+                f.write(f'\n#EXTINF:-1 group-title="{INDEX_GROUP}",{group} ({count})\n{base}{rel_dir}/{slug}.m3u')
+        os.replace(index_path + tmp, index_path)
+        shard_sizes = sorted(os.path.getsize(os.path.join(shard_dir, slug + ".m3u")) for slug in groups) or [0]
+        sizes.update(shards=len(groups), index_bytes=os.path.getsize(index_path),
+                     median_shard_bytes=shard_sizes[len(shard_sizes) // 2], largest_shard_bytes=shard_sizes[-1])
+
+    seconds = round(time.monotonic() - start, 4)
+    metrics.record("stages", "variants", seconds=seconds, **sizes)
+    summary = f"📦 {path}: {format_size(sizes['bytes'])} | gzip {format_size(sizes['gzip_bytes'])}"
+    if shards:
+        summary += (f" | {sizes['shards']} group shards, median {format_size(sizes['median_shard_bytes'])}"
+                    f", largest {format_size(sizes['largest_shard_bytes'])} | index {format_size(sizes['index_bytes'])}")
+    print(f"{summary} | {seconds * 1000:.0f} ms")
+    return sizes
@@ -0,0 +1,183 @@
+import ipaddress
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+import fetch_archive
+import http_session
+import metrics
+from m3u_parser import M3UEntry
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# off    -> no probing (default)
+# report -> probe and print, playlist unchanged
+# demote -> dead entries move to DEAD_GROUP
+# drop   -> dead entries are removed
+PROBE_MODE = os.environ.get("PROBE_MODE", "off")
+PROBE_TTL = int(os.environ.get("PROBE_TTL", 3600))  # Seconds a probe result is reused
+PROBE_DEADLINE = 90  # Seconds for the WHOLE probe stage
+PROBE_TIMEOUT = 8
+MAX_WORKERS = 32
+PER_HOST_LIMIT = 4
+DEAD_GROUP = "Offline"
+CACHE_FILE = os.path.join(".cache", "probe.json")
+PLACEHOLDER_SUFFIX = "/000.m3u8"  # update_playlist's "no stream found" link
+UA_HEADER = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# ==========================================
+# URL + HEADER SUFFIX
+# ==========================================
+# "https://x/y.m3u8|User-Agent=abc&Referer="https://z/"" -> (url, {"User-Agent": "abc", "Referer": "https://z/"})
+HEADER_NAMES = {"user-agent": "User-Agent", "referer": "Referer", "referrer": "Referer",
+                "origin": "Origin", "cookie": "Cookie"}
+
+def split_url_line(url_line):
+    url, _, suffix = url_line.partition("|")
+    headers = {"User-Agent": UA_HEADER}
+    key, value = None, []
+    for part in suffix.split("&") if suffix else []:
+        name, eq, rest = part.partition("=")
+        if eq and name.strip().lower() in HEADER_NAMES:
+            if key: headers[key] = "&".join(value).strip().strip('"')
+            key, value = HEADER_NAMES[name.strip().lower()], [rest]
+        elif key: value.append(part)  # "&" inside a header value (cookies)
+    if key: headers[key] = "&".join(value).strip().strip('"')
+    return url.strip(), headers
+
+def is_probeable(url):
+    # LAN addresses (the local JioTV server) can't be reached from CI; loopback stays probeable
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname: return False
+    try: ip = ipaddress.ip_address(parts.hostname)
+    except ValueError: return True
+    return ip.is_loopback or not (ip.is_private or ip.is_unspecified)
+
+# ==========================================
+# CONCURRENT PROBE
+# ==========================================
+# HEAD first; servers that refuse HEAD get a streamed GET that reads only the
+# first chunk. Anything below 400 counts as alive. Hosts get at most
+# PER_HOST_LIMIT requests in flight so one CDN doesn't get hammered.
+_host_locks = {}
+_host_guard = threading.Lock()
+
+def _host_slot(url):
+    host = urlsplit(url).netloc
+    with _host_guard:
+        if host not in _host_locks: _host_locks[host] = threading.Semaphore(PER_HOST_LIMIT)
+        return _host_locks[host]
+
+def probe_url(url_line, timeout=PROBE_TIMEOUT):
+    url, headers = split_url_line(url_line)
+    session = http_session.get_session()
+    with _host_slot(url):
+        start = time.monotonic()  # startup latency: until the first answer (or first chunk on the GET fallback)
+        try:
+            r = session.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+            status = r.status_code
+            if status >= 400:
+                start = time.monotonic()
+                # Recording a live stream would never end; only its status is kept
+                with fetch_archive.headers_only(), session.get(url, headers=headers, timeout=timeout, stream=True) as r:
+                    status = r.status_code
+                    if status < 400: next(r.iter_content(1024), None)
+            return {"alive": status < 400, "status": status, "seconds": round(time.monotonic() - start, 4)}
+        except Exception as e:
+            return {"alive": False, "status": type(e).__name__, "seconds": round(time.monotonic() - start, 4)}
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def _save_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(CACHE_FILE + ".tmp", "w", encoding="utf-8") as f: json.dump(cache, f)
+        os.replace(CACHE_FILE + ".tmp", CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️ Could not write probe cache: {e}")
+
+def probe_all(url_lines, ttl=PROBE_TTL, deadline=PROBE_DEADLINE):
+    # -> {url_line: True (alive) | False (dead) | None (not probed)}
+    now = time.time()
+    cache = {k: v for k, v in _load_cache().items() if now - v.get("checked", 0) < ttl}
+    results, todo = {}, []
+    counts = {"alive": 0, "dead": 0, "skipped": 0, "cached": 0, "probed": 0}
+    for url_line in dict.fromkeys(url_lines):
+        url = url_line.partition("|")[0].strip()
+        if url.endswith(PLACEHOLDER_SUFFIX): results[url_line] = False
+        elif not is_probeable(url): results[url_line] = None
+        elif url_line in cache: results[url_line] = cache[url_line]["alive"]; counts["cached"] += 1
+        else: todo.append(url_line)
+
+    pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    futures = {pool.submit(probe_url, url_line): url_line for url_line in todo}
+    wait(futures, timeout=deadline)
+    pool.shutdown(wait=False, cancel_futures=True)
+    for fut, url_line in futures.items():
+        if fut.done() and not fut.cancelled():
+            result = fut.result()
+            result["checked"] = now
+            cache[url_line] = result
+            results[url_line] = result["alive"]
+            counts["probed"] += 1
+        else: results[url_line] = None  # ran out of time, benefit of the doubt
+    _save_cache(cache)
+
+    for alive in results.values():
+        if alive is None: counts["skipped"] += 1
+        elif alive: counts["alive"] += 1
+        else: counts["dead"] += 1
+    metrics.record("stages", "probe", **counts)
+    print(f"🩺 Probe: alive {counts['alive']} | dead {counts['dead']} | not probed {counts['skipped']} "
+          f"| cached {counts['cached']} | probed {counts['probed']}")
+    return results
+
+# ==========================================
+# PLAYLIST STAGE
+# ==========================================
+# Sits between a builder and write_if_changed(). With probing off it passes
+# the stream through untouched; otherwise it has to see every URL before it
+# can decide, so the playlist is buffered once for this stage.
+def _blocks(lines):
+    # -> [(first line index, #EXTINF index, URL index)] per channel
+    blocks, start, extinf = [], None, None
+    for i, line in enumerate(lines):
+        if not line or line.startswith(("#EXTM3U", "# ")): continue
+        if line.startswith("#"):
+            if start is None: start = i
+            if line.startswith("#EXTINF"): extinf = i
+        else:
+            if extinf is not None: blocks.append((start, extinf, i))
+            start, extinf = None, None
+    return blocks
+
+def apply_probe(lines, mode=None):
+    mode = mode or PROBE_MODE
+    if mode == "off":
+        yield from lines
+        return
+    with metrics.timed_stage("probe"):
+        lines = list(lines)
+        blocks = _blocks(lines)
+        results = probe_all(lines[url] for _, _, url in blocks)
+    skip, rewrite = set(), {}
+    for start, extinf, url in blocks:
+        if results.get(lines[url]) is not False: continue
+        if mode == "drop": skip.update(range(start, url + 1))
+        elif mode == "demote": rewrite[extinf] = M3UEntry(lines[extinf]).extinf_with({"group-title": DEAD_GROUP})
+    for i, line in enumerate(lines):
+        if i not in skip: yield rewrite.get(i, line)
+
+if __name__ == "__main__":
+    # python probe.py playlist.m3u  -> report dead links without touching the file
+    with open(sys.argv[1], "r", encoding="utf-8") as f: playlist = f.read().split("\n")
+    results = probe_all(playlist[url] for _, _, url in _blocks(playlist))
+    for url_line, alive in results.items():
+        if alive is False: print(f"   ❌ {url_line}")
@@ -0,0 +1,145 @@
+import argparse
+import glob
+import gzip
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import build
+import create_pocket_playlist as pocket
+import epg
+import http_session
+import metrics
+import output_variants
+import update_playlist as playlist
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# Seconds an upstream response stays warm before the next cycle refetches it.
+# Live event lists change by the minute, the channel lists rarely; anything
+# not listed uses DEFAULT_REFRESH. Local files (template, reference map,
+# youtube.txt) are re-hashed every cycle and only reparsed when they change.
+REFRESH_INTERVALS = {
+    playlist.fancode_url: 300, playlist.sony_m3u: 300, playlist.zee_m3u: 300,
+    pocket.ZEE_LIVE_URL: 300, pocket.YOUTUBE_LIVE_URL: 300, pocket.JIO_EVENTS_JSON: 300,
+    pocket.JIO_WORKER_URL: 600, pocket.JIO_COOKIE_JSON: 600,
+    playlist.backup_url: 3600, playlist.pocket_url: 3600, pocket.ZEE_JOKER_URL: 3600,
+}
+DEFAULT_REFRESH = 900
+TICK = min(REFRESH_INTERVALS.values())  # Seconds between cycles
+EPG_REFRESH = 6 * 3600
+HOST = "0.0.0.0"
+PORT = int(os.environ.get("SERVE_PORT", 8080))
+SERVED_FILES = {
+    "/playlist.m3u": (playlist.output_file, "audio/x-mpegurl"),
+    "/pocket_playlist.m3u": (pocket.OUTPUT_FILE, "audio/x-mpegurl"),
+    "/epg.xml.gz": (epg.EPG_OUTPUT, "application/gzip"),
+}
+
+# ==========================================
+# IN-MEMORY PLAYLISTS
+# ==========================================
+# Each served file is held as (etag, body, gzipped body, content type). It
+# is reloaded after a cycle only when the file on disk changed, so the ETag
+# stays the same between cycles that produced nothing new and players get a
+# 304. Group shards and their index are picked up when sharding is on.
+_served = {}
+_served_lock = threading.Lock()
+
+def served_files():
+    # The fixed outputs plus, when sharding is on, every group shard and index playlist
+    files = dict(SERVED_FILES)
+    for filename, _ in SERVED_FILES.values():
+        _, shard_dir, index_path = output_variants.variant_paths(filename)
+        for name in [index_path] + sorted(glob.glob(os.path.join(shard_dir, "*.m3u"))):
+            if os.path.exists(name): files["/" + name.replace(os.sep, "/")] = (name, "audio/x-mpegurl")
+    return files
+
+def reload_served():
+    files = served_files()
+    with _served_lock:
+        for path in [p for p in _served if p not in files]: del _served[path]  # shard of a group that's gone
+    for path, (filename, content_type) in files.items():
+        try:
+            with open(filename, "rb") as f: body = f.read()
+        except OSError: continue
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        with _served_lock:
+            if path in _served and _served[path][0] == etag: continue
+        # The guide is gzip already
+        packed = None if filename.endswith(".gz") else gzip.compress(body, mtime=0)
+        with _served_lock: _served[path] = (etag, body, packed, content_type)
+
+class PlaylistHandler(BaseHTTPRequestHandler):
+    def do_GET(self, head=False):
+        with _served_lock: served = _served.get(self.path.split("?")[0])
+        if served is None:
+            self.send_error(404)
+            return
+        etag, body, packed, content_type = served
+        use_gzip = packed is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+        if use_gzip: etag, body = etag[:-1] + '-gz"', packed
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        if packed is not None: self.send_header("Vary", "Accept-Encoding")
+        if use_gzip: self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if not head: self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def log_message(self, format, *args):
+        pass  # one line per player poll would drown the build log
+
+# ==========================================
+# SCHEDULER
+# ==========================================
+# One process for as long as it runs: the pooled session, the shared
+# responses and the section caches stay warm, and every TICK seconds the
+# upstreams past their interval are dropped and both playlists rebuilt.
+# Unchanged upstreams come straight from memory.
+def refresh_interval(url):
+    return REFRESH_INTERVALS.get(url, DEFAULT_REFRESH)
+
+def run_cycle():
+    metrics.reset()
+    expired = http_session.expire_shared(refresh_interval)
+    print(f"\n🔁 Cycle at {time.strftime('%Y-%m-%d %H:%M:%S')} | refetching {expired} upstreams")
+    failed = build.build_outputs()
+    reload_served()
+    return failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the playlists on a schedule and serve them over HTTP")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--tick", type=int, default=TICK, help="seconds between cycles")
+    args = parser.parse_args(argv)
+
+    epg.EPG_MAX_AGE = max(epg.EPG_MAX_AGE, EPG_REFRESH)
+    http_session.share_responses()
+    reload_served()  # serve the last build while the first cycle runs
+    server = ThreadingHTTPServer((args.host, args.port), PlaylistHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📡 Serving {', '.join(SERVED_FILES)} on http://{args.host}:{args.port}")
+    try:
+        while True:
+            started = time.monotonic()
+            run_cycle()
+            time.sleep(max(0, args.tick - (time.monotonic() - started)))
+    except KeyboardInterrupt: print("\n👋 Stopping.")
+    finally: server.shutdown()
+
+if __name__ == "__main__":
+    main()
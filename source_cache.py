@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+CACHE_DIR = os.path.join(".cache", "sources")
+# How long a last-good copy may stand in for a failed source (seconds)
+SOURCE_CACHE_TTL = int(os.environ.get("SOURCE_CACHE_TTL", 6 * 3600))
+
+# ==========================================
+# LAST-GOOD SOURCE RESULTS
+# ==========================================
+# Every successful fetch job stores its parsed result here. When the same
+# source later fails or times out, fetch_pool serves this copy instead of an
+# empty list, as long as it is younger than the TTL.
+def _path(key):
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+def save_source(key, value):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump({"key": key, "saved": time.time(), "value": value}, f)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"⚠️ Could not cache source {key}: {e}")
+
+def load_source(key, ttl=SOURCE_CACHE_TTL):
+    # -> (value, age in seconds) or (None, None) when missing or expired
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f: cached = json.load(f)
+    except (OSError, ValueError): return None, None
+    age = time.time() - cached.get("saved", 0)
+    if age > ttl: return None, None
+    return cached["value"], age
+
+def format_age(seconds):
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h {minutes % 60}m" if minutes >= 60 else f"{minutes}m"
@@ -0,0 +1,95 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import metrics
+from probe import is_probeable, probe_url
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+STATS_FILE = os.path.join(".cache", "stream_stats.json")
+STATS_TTL = int(os.environ.get("STATS_TTL", 3600))  # Seconds before a stream is measured again
+STATS_MAX_AGE = 7 * 24 * 3600  # Streams not seen for a week are forgotten
+EWMA_WEIGHT = 0.3  # Share of the newest measurement in the running averages
+MIN_AVAILABILITY = 0.5  # Below this a stream counts as failing
+MEASURE_DEADLINE = 90  # Seconds for the WHOLE measuring pass
+MAX_WORKERS = 32
+
+# ==========================================
+# PERSISTENT STREAM STATS
+# ==========================================
+# Per URL line: exponentially weighted startup latency (seconds until the
+# first answer) and availability (share of probes that got one), plus when
+# it was last measured. Kept in .cache/, which the workflow restores between
+# runs, so every run adds to the history instead of starting over.
+class StreamStats:
+    def __init__(self, path=STATS_FILE):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f: self.streams = json.load(f)
+        except (OSError, ValueError): self.streams = {}
+
+    def save(self):
+        now = time.time()
+        self.streams = {k: v for k, v in self.streams.items() if now - v["checked"] < STATS_MAX_AGE}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f: json.dump(self.streams, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            print(f"⚠️ Could not write stream stats: {e}")
+
+    def update(self, url_line, result, now=None):
+        now = now or time.time()
+        alive = 1.0 if result["alive"] else 0.0
+        old = self.streams.get(url_line)
+        if old is None: self.streams[url_line] = {"latency": result["seconds"], "availability": alive, "checked": now}
+        else:
+            if alive: old["latency"] += EWMA_WEIGHT * (result["seconds"] - old["latency"])
+            old["availability"] += EWMA_WEIGHT * (alive - old["availability"])
+            old["checked"] = now
+
+    def measure(self, url_lines, ttl=STATS_TTL, deadline=MEASURE_DEADLINE):
+        # Probes every probeable URL whose numbers are older than `ttl`
+        now = time.time()
+        todo = [u for u in dict.fromkeys(url_lines) if is_probeable(u.partition("|")[0].strip())
+                and now - self.streams.get(u, {}).get("checked", 0) >= ttl]
+        pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        futures = {pool.submit(probe_url, u): u for u in todo}
+        wait(futures, timeout=deadline)
+        pool.shutdown(wait=False, cancel_futures=True)
+        measured = 0
+        for fut, url_line in futures.items():
+            if fut.done() and not fut.cancelled():
+                self.update(url_line, fut.result(), now)
+                measured += 1
+        return measured
+
+    def rank_key(self, url_line, priority):
+        # Streams the build can't reach (the LAN JioTV server) keep their
+        # source-priority place ahead of the rest; then working streams by
+        # latency, then unmeasured ones, then failing ones
+        if not is_probeable(url_line.partition("|")[0].strip()): return (0, 0, 0, priority)
+        stats = self.streams.get(url_line)
+        if stats is None: return (1, 1, 0, priority)
+        if stats["availability"] < MIN_AVAILABILITY: return (1, 2, stats["latency"], priority)
+        return (1, 0, stats["latency"], priority)
+
+    def rank(self, blocks):
+        # blocks: candidate line blocks (props..., URL line) in source priority order
+        order = sorted(range(len(blocks)), key=lambda i: self.rank_key(blocks[i][-1], i))
+        return [blocks[i] for i in order]
+
+def rank_channels(channels, stats=None):
+    # channels: [(#EXTINF line, [candidate blocks])] -> same, best candidate first
+    stats = stats or StreamStats()
+    with metrics.timed_stage("rank"):
+        measured = stats.measure(block[-1] for _, blocks in channels if len(blocks) > 1 for block in blocks)
+        ranked = [(extinf, stats.rank(blocks) if len(blocks) > 1 else blocks) for extinf, blocks in channels]
+        stats.save()
+    reordered = sum(1 for (_, a), (_, b) in zip(channels, ranked) if a[:1] != b[:1])
+    runners_up = sum(len(blocks) - 1 for _, blocks in ranked)
+    metrics.record("stages", "rank", measured=measured, reordered=reordered, runners_up=runners_up)
+    print(f"🏁 Ranking: measured {measured} | new primary {reordered} | runners-up {runners_up}")
+    return ranked
@@ -0,0 +1,54 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from channel_index import DIGITS_RE, ChannelIndex, clean_name_key, marker_tokens
+from m3u_parser import iter_entries
+
+# ==========================================
+# FUZZY MATCHING MUST NOT CROSS CHANNELS
+# ==========================================
+# fixtures/channel_names.txt is a snapshot of every channel name in both
+# published playlists. Each template.m3u name is resolved against it with
+# its own key taken out, so only the fuzzy fallback can answer; whatever it
+# picks must be a spelling variant, never another channel.
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def read_names(path):
+    with open(path, "r", encoding="utf-8") as f: return [line.strip() for line in f if line.strip()]
+
+def template_names():
+    with open(os.path.join(ROOT, "template.m3u"), "r", encoding="utf-8") as f:
+        return [entry.name for entry in iter_entries(f) if entry.name]
+
+def pool_without(key):
+    pool = {clean_name_key(n) for n in read_names(os.path.join(FIXTURES, "channel_names.txt"))}
+    index = ChannelIndex({})
+    index.add_source("pool", {k: k for k in pool if k != key})
+    return index
+
+def test_template_names_never_fuzzy_match_another_channel():
+    names = template_names()
+    template_keys = {clean_name_key(n) for n in names}
+    for name in names:
+        key = clean_name_key(name)
+        match = pool_without(key).resolve(name)
+        if match is None: continue
+        _, found, how = match
+        assert how == "fuzzy"
+        assert found not in template_keys, f"{name!r} took the template's own {found!r}"
+        assert marker_tokens(found) == marker_tokens(key), f"{name!r} -> {found!r}"
+        assert DIGITS_RE.findall(found) == DIGITS_RE.findall(key), f"{name!r} -> {found!r}"
+
+def test_known_cross_channel_pairs_are_rejected():
+    index = ChannelIndex({})
+    index.add_source("pool", {k: k for k in ("nickelodeon", "disneychannelhd", "starvijay", "isaiaruvifm")})
+    for name in ("Nickelodeon Jr.", "Disney Channel", "Star Vijay HD", "Isaiaruvi"):
+        assert index.resolve(name) is None, name
+
+def test_spelling_variants_still_match():
+    index = ChannelIndex({})
+    index.add_source("pool", {k: k for k in ("puthiyathalaimurai", "chithiram")})
+    assert index.resolve("Puthiya Thalimurai") == ("pool", "puthiyathalaimurai", "fuzzy")
+    assert index.resolve("Chithiram TV") == ("pool", "chithiram", "fuzzy")
@@ -0,0 +1,42 @@
+import gzip
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import epg
+
+# ==========================================
+# GUIDE TRIMMING ON A FIXTURE GUIDE
+# ==========================================
+# fixtures/guide.xml has one channel wanted by tvg-id, one wanted only by
+# its display name and one nobody asked for, each with programmes.
+GUIDE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "guide.xml")
+
+def trimmed(path):
+    with gzip.open(path, "rb") as f: root = ET.parse(f).getroot()
+    return ([c.get("id") for c in root.iter("channel")],
+            [(p.get("channel"), p.findtext("title")) for p in root.iter("programme")])
+
+def test_keeps_channels_matched_by_id_or_name_and_their_programmes(tmp_path):
+    output = str(tmp_path / "epg.xml.gz")
+    counts, changed = epg.filter_guide(GUIDE, {"sun.tv.hd"}, {"starvijayhd"}, output)
+    channels, programmes = trimmed(output)
+    assert channels == ["sun.tv.hd", "ch-143"]
+    assert programmes == [("sun.tv.hd", "Morning Show"), ("ch-143", "Bigg Boss"), ("ch-143", "Cooku with Comali")]
+    assert counts == {"channels": 3, "programmes": 4, "kept_channels": 2, "kept_programmes": 3}
+    assert changed
+
+def test_same_guide_twice_leaves_the_output_alone(tmp_path):
+    output = str(tmp_path / "epg.xml.gz")
+    epg.filter_guide(GUIDE, {"sun.tv.hd"}, (), output)
+    with open(output, "rb") as f: first = f.read()
+    _, changed = epg.filter_guide(GUIDE, {"sun.tv.hd"}, (), output)
+    with open(output, "rb") as f: assert f.read() == first
+    assert not changed
+
+def test_nothing_wanted_keeps_nothing(tmp_path):
+    output = str(tmp_path / "epg.xml.gz")
+    epg.filter_guide(GUIDE, set(), set(), output)
+    assert trimmed(output) == ([], [])
@@ -0,0 +1,26 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from create_pocket_playlist import GROUP_CLASSIFIER
+
+# ==========================================
+# RULE TABLE vs THE PUBLISHED GROUPS
+# ==========================================
+# fixtures/pocket_groups.tsv: every channel of pocket_playlist.m3u under its
+# published group and under each raw upstream group the rules key on, with
+# the group the original if-chain gave it. The compiled GROUP_RULES must
+# reproduce every row.
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pocket_groups.tsv")
+
+def read_cases():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n").split("\t") for line in f if line.strip() and not line.startswith("#")]
+
+def test_rule_table_reproduces_published_groups():
+    cases = read_cases()
+    assert len(cases) > 1000
+    wrong = [(group, name, expected, GROUP_CLASSIFIER.classify(group, name))
+             for group, name, expected in cases if GROUP_CLASSIFIER.classify(group, name) != expected]
+    assert not wrong, f"{len(wrong)} of {len(cases)} regrouped differently, e.g. {wrong[:5]}"
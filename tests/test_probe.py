@@ -0,0 +1,68 @@
+import http.server
+import os
+import sys
+import threading
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import probe
+
+# ==========================================
+# PROBE AGAINST A LOCAL STAND-IN
+# ==========================================
+# /alive answers HEAD and GET, /missing is a 404 and /nohead refuses HEAD
+# but streams on GET, so the GET fallback has to rescue it.
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def _answer(self, body):
+        if self.path == "/missing": self.send_response(404)
+        elif self.path == "/nohead" and self.command == "HEAD": self.send_response(405)
+        else: self.send_response(200)
+        self.send_header("Content-Length", "4")
+        self.end_headers()
+        if body: self.wfile.write(b"live")
+
+    def do_HEAD(self):
+        self._answer(False)
+
+    def do_GET(self):
+        self._answer(True)
+
+    def log_message(self, *args): pass
+
+@pytest.fixture(scope="module")
+def base():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+@pytest.fixture(autouse=True)
+def probe_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(probe, "CACHE_FILE", str(tmp_path / "probe.json"))
+
+def playlist(base):
+    return ["#EXTM3U",
+            '#EXTINF:-1 group-title="News",Alive', f"{base}/alive|User-Agent=test",
+            '#EXTINF:-1 group-title="News",Missing', f"{base}/missing",
+            '#EXTINF:-1 group-title="News",No Head', f"{base}/nohead",
+            '#EXTINF:-1 group-title="News",Home Server', "http://192.168.0.146:5350/x.m3u8"]
+
+def test_probe_all(base):
+    results = probe.probe_all([f"{base}/alive|User-Agent=test", f"{base}/missing", f"{base}/nohead",
+                               "http://192.168.0.146:5350/x.m3u8"])
+    assert results == {f"{base}/alive|User-Agent=test": True, f"{base}/missing": False,
+                       f"{base}/nohead": True, "http://192.168.0.146:5350/x.m3u8": None}
+
+def test_demote_moves_only_the_dead_entry(base):
+    lines = list(probe.apply_probe(playlist(base), mode="demote"))
+    assert lines[3] == f'#EXTINF:-1 group-title="{probe.DEAD_GROUP}",Missing'
+    assert [l for i, l in enumerate(lines) if i != 3] == [l for i, l in enumerate(playlist(base)) if i != 3]
+
+def test_drop_removes_only_the_dead_entry(base):
+    lines = list(probe.apply_probe(playlist(base), mode="drop"))
+    assert lines == playlist(base)[:3] + playlist(base)[5:]
+
+def test_report_and_off_leave_the_playlist_alone(base):
+    assert list(probe.apply_probe(playlist(base), mode="report")) == playlist(base)
+    assert list(probe.apply_probe(playlist(base), mode="off")) == playlist(base)
@@ -0,0 +1,34 @@
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from youtube_txt import STREAM_PREFIXES, YoutubeChannel, format_youtube_txt, read_youtube_txt
+
+# ==========================================
+# ROUND-TRIP FUZZ
+# ==========================================
+# Random channel lists must survive format -> read unchanged, minus the
+# channels whose link is empty or not a stream URL. Titles and logos carry
+# colons, pipes and quotes; links carry header suffixes past 800 chars.
+def random_channel(rng):
+    text = lambda n: "".join(rng.choice("abcXYZ 09:|&=/.-_\"'#()[]ñ") for _ in range(rng.randint(0, n))).strip()
+    if rng.random() < 0.1: return YoutubeChannel(text(30), text(60), (), rng.choice(["", text(40), "ftp://host/x"]))
+    link = rng.choice(STREAM_PREFIXES) + "host/" + text(40).replace(" ", "")
+    if rng.random() < 0.5: link += "|User-Agent=Mozilla/5.0 (X; Y)&Referer=https://r/&clearkey=" + "ab" * rng.randint(0, 400)
+    props = tuple(("#KODIPROP:" + text(80)).strip() for _ in range(rng.randint(0, 3)))
+    return YoutubeChannel(text(30), text(60), props, link)
+
+def test_format_then_read_round_trips():
+    rng = random.Random(0)
+    for i in range(2000):
+        channels = [random_channel(rng) for _ in range(rng.randint(0, 6))]
+        back = list(read_youtube_txt(format_youtube_txt(channels)))
+        expected = [ch for ch in channels if ch.link.lower().startswith(STREAM_PREFIXES)]
+        assert back == expected, f"iteration {i}: {channels!r} -> {back!r}"
+
+def test_empty_or_junk_link_closes_the_channel():
+    lines = ["Title: Gone", "Logo: https://l/x.png", "#KODIPROP:a=b", "Link:",
+             "Title: Kept", "Link: https://host/x.m3u8"]
+    assert list(read_youtube_txt(lines)) == [YoutubeChannel("Kept", "", (), "https://host/x.m3u8")]
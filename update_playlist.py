@@ -1,7 +1,17 @@
-import requests
-import re
 import datetime
 import os
+import itertools
+import http_session
+import metrics
+import epg
+from fetch_pool import run_fetch_jobs
+from probe import apply_probe
+from stream_stats import rank_channels
+from m3u_parser import M3UEntry, iter_entries, tokenize_extinf
+from channel_index import ChannelIndex, clean_name_key
+from youtube_txt import load_youtube_txt, render_m3u
+from output_variants import write_variants
+from build_manifest import section, file_digest, write_if_changed, save_manifest, STATS as SECTION_STATS
 
 # ==========================================
 # CONFIGURATION
@@ -17,7 +27,7 @@ backup_url = "https://raw.githubusercontent.com/fakeall12398-sketch/JIO_TV/refs/
 fancode_url = "https://raw.githubusercontent.com/Jitendra-unatti/fancode/main/data/fancode.m3u"
 sony_m3u = "https://raw.githubusercontent.com/doctor-8trange/zyphora/refs/heads/main/data/sony.m3u"
 zee_m3u = "https://raw.githubusercontent.com/doctor-8trange/quarnex/refs/heads/main/data/zee5.m3u"
-pocket_url = "https://raw.githubusercontent.com/Arunjunan20/My-IPTV/refs/heads/main/index.html"
+pocket_url = "https://raw.githubusercontent.com/Arunjunan20/My-IPTV/main/index.html"
 
 # REMOVAL LIST
 REMOVE_KEYWORDS = ["apac", "zee tamil hd apac"]
@@ -34,146 +44,173 @@ NAME_OVERRIDES = {
     "nat geo wild hd": "Nat Geo Wild HD",
 }
 
+# SOURCE RANKING
+# off -> each template channel gets the first source that has it (local, then backup)
+# on  -> the local, backup and Pocket copies are all candidates: the fastest
+#        measured one becomes the channel, the runners-up go in as Backup entries
+RANK_MODE = os.environ.get("RANK_MODE", "off")
+BACKUP_GROUP = "Backup"
+
 DEFAULT_LOGO = "https://upload.wikimedia.org/wikipedia/commons/thumb/c/c4/Globe_icon.svg/1200px-Globe_icon.svg.png"
 UA_HEADER = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 # ==========================================
 # HELPER FUNCTIONS
 # ==========================================
-def clean_name_key(name):
-    name = re.sub(r'\[.*?\]|\(.*?\)', '', name)
-    name = re.sub(r'[^a-zA-Z0-9]', '', name)
-    return name.lower().strip()
-
-def find_best_backup_link(original_name, backup_map):
-    clean_orig = clean_name_key(original_name)
-    if clean_orig in backup_map: return backup_map[clean_orig]
-    clean_mapped = None
-    for k, v in NAME_OVERRIDES.items():
-        if clean_name_key(k) == clean_orig: clean_mapped = clean_name_key(v); break
-    if clean_mapped and clean_mapped in backup_map: return backup_map[clean_mapped]
-    return None
-
-def load_local_map(ref_file):
+def parse_local_map(ref_file):
+    # One #EXTINF line at a time, so a tvg-id is only ever paired with the
+    # name on its own line; entries without tvg-name fall back to the title
     id_map = {}
     try:
-        with open(ref_file, "r", encoding="utf-8") as f: content = f.read()
-        pattern = r'tvg-id="(\d+)".*?tvg-name="([^"]+)"'
-        matches = re.findall(pattern, content)
-        for ch_id, ch_name in matches: id_map[clean_name_key(ch_name)] = ch_id
-    except: pass
+        with open(ref_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.startswith("#EXTINF"): continue
+                _, attrs, title, _ = tokenize_extinf(line.strip())
+                ch_id = attrs.get("tvg-id", "")
+                ch_name = attrs.get("tvg-name") or title
+                if ch_id.isdigit() and ch_name: id_map[clean_name_key(ch_name)] = ch_id
+    except OSError: pass
     return id_map
 
-def fetch_backup_map(url):
+def load_local_map(ref_file):
+    # Index persisted in the section cache, keyed by the file's content hash
+    return section(f"local map:{ref_file}", [file_digest(ref_file)], lambda: parse_local_map(ref_file))
+
+def parse_backup_blocks(entries):
     block_map = {}
-    try:
-        r = requests.get(url, timeout=15)
-        if r.status_code == 200:
-            lines = r.text.splitlines()
-            current_block = []; current_name = ""
-            for line in lines:
-                line = line.strip()
-                if not line: continue
-                if line.startswith("#EXTINF"):
-                    if current_name and current_block:
-                        key = clean_name_key(current_name)
-                        data = [l for l in current_block if not l.startswith("#EXTINF")]
-                        block_map[key] = data 
-                    current_name = line.split(",")[-1].strip()
-                    current_block = [line]
-                else:
-                    if current_block: current_block.append(line)
-            if current_name: block_map[clean_name_key(current_name)] = [l for l in current_block if not l.startswith("#EXTINF")]
-    except: pass
+    for entry in entries:
+        if entry.name: block_map[clean_name_key(entry.name)] = entry.props + [entry.url_line]
     return block_map
 
+def fetch_backup_map(url):
+    r = http_session.get(url, timeout=15, stream=True)
+    r.raise_for_status()
+    # Parsed while it downloads, or not at all when the cached section still fits the body
+    return section(f"backup:{url}", [r.digest], lambda: parse_backup_blocks(r.entries()))
+
 def parse_youtube_txt():
     print("   ...Reading youtube.txt")
+    return render_m3u(load_youtube_txt(youtube_file), default_title="Unknown Channel",
+                      logo_for=lambda title: DEFAULT_LOGO, user_agent=UA_HEADER)
+
+def regroup_lines(entries, group_name):
     lines = []
-    if not os.path.exists(youtube_file): return []
-    try:
-        with open(youtube_file, "r", encoding="utf-8", errors="ignore") as f:
-            file_lines = f.readlines()
-        current_title = "Unknown Channel"; current_logo = DEFAULT_LOGO; current_props = [] 
-        for line in file_lines:
-            line = line.strip()
-            if not line: continue
-            if len(line) > 600: continue
-            lower_line = line.lower()
-            if lower_line.startswith("title"):
-                parts = line.split(":", 1); current_title = parts[1].strip() if len(parts)>1 else "Unknown"
-            elif lower_line.startswith("logo"):
-                parts = line.split(":", 1); current_logo = parts[1].strip() if len(parts)>1 else DEFAULT_LOGO
-            elif line.startswith("#"): current_props.append(line)
-            elif "http" in lower_line:
-                url = line[line.lower().find("http"):].strip()
-                if current_props: lines.extend(current_props); current_props = [] 
-                lines.append(f'#EXTINF:-1 group-title="Temporary Channels" tvg-logo="{current_logo}",{current_title}')
-                if "|" not in url and "http" in url: url += f"|User-Agent={UA_HEADER}"
-                lines.append(url)
-                current_title = "Unknown Channel"; current_logo = DEFAULT_LOGO; current_props = []
-    except Exception as e: print(f"   ❌ Error reading youtube.txt: {e}")
+    for entry in entries:
+        lines.extend(entry.lines(entry.extinf_with({"group-title": group_name})))
     return lines
 
 def fetch_and_group(url, group_name):
-    entries = []
     print(f"🌍 Fetching into '{group_name}'...")
-    try:
-        r = requests.get(url, headers={"User-Agent": UA_HEADER}, timeout=15)
-        if r.status_code == 200:
-            lines = r.text.splitlines()
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith("#EXTM3U"): continue
-                if line.startswith("#EXTINF"):
-                    line = re.sub(r'group-title="[^"]*"', '', line)
-                    line = re.sub(r'(#EXTINF:[-0-9]+)', f'\\1 group-title="{group_name}"', line)
-                entries.append(line)
-    except: pass
-    return entries
-
-def fetch_pocket_extras():
-    entries = []
+    r = http_session.get(url, headers={"User-Agent": UA_HEADER}, timeout=15, stream=True)
+    r.raise_for_status()
+    return section(f"group:{url}", [r.digest, group_name], lambda: regroup_lines(r.entries(), group_name))
+
+def extract_pocket_extras(entries):
+    # REMOVED ZEE TAMIL from here. Only standard extras remain.
+    SPECIFIC_WANTED = ["rasi", "astro", "vijay takkar"]
+    lines = []
+    for entry in entries:
+        name = entry.name
+        name_lower = name.lower()
+
+        if "apac" in name_lower: continue 
+
+        target_group = None
+        if entry.group in ("Sports", "Sports HD"): target_group = "Sports Extra"
+        elif entry.group in ("Tamil", "Tamil HD"): target_group = "Tamil Extra"
+        elif any(x in name_lower for x in SPECIFIC_WANTED):
+             if "cricket" in name_lower or "sport" in name_lower: target_group = "Sports Extra"
+             else: target_group = "Tamil Extra"
+        
+        if target_group:
+            logo = entry.attrs.get("tvg-logo", "")
+            link = entry.url_line
+            if "http" in link and "|" not in link: link += f"|User-Agent={UA_HEADER}"
+            meta = f'#EXTINF:-1 group-title="{target_group}" tvg-logo="{logo}",{name}'
+            lines.append(meta)
+            lines.extend(entry.props)  # clearkey license / cookie lines, without them DRM streams won't play
+            lines.append(link)
+    return lines
+
+def fetch_pocket_sources():
+    # -> {"extras": extra channel lines, "map": name key -> block}; the map is
+    # only built (and cached) when ranking is on, else it stays empty
     print(f"🌍 Fetching & Filtering Pocket TV...")
+    r = http_session.get(pocket_url, headers={"User-Agent": UA_HEADER}, timeout=15, stream=True)
+    r.raise_for_status()
+    entries = section(f"pocket:{pocket_url}", [r.digest], lambda: extract_pocket_extras(r.entries()))
+    block_map = {}
+    if RANK_MODE == "on":
+        block_map = section(f"pocket map:{pocket_url}", [r.digest], lambda: parse_backup_blocks(r.entries()))
+    print(f"✅ Extracted {metrics.count_entries(entries)} Requested Channels.")
+    return {"extras": entries, "map": block_map}
+
+def candidate_blocks(matches):
+    # (label, value, how) matches -> URL blocks, duplicates of an earlier source dropped
+    blocks, seen = [], set()
+    for source, value, _ in matches:
+        block = [f"{base_url}/{value}.m3u8"] if source == "local" else value
+        if block[-1] not in seen: blocks.append(block); seen.add(block[-1])
+    return blocks
+
+def build_template_section(local_map, backup_map, pocket_map=None):
+    # With a pocket_map (ranking on) every placeholder channel that more than
+    # one source carries is also listed in "channels" as [position of its URL
+    # block in "lines", block length, #EXTINF, every candidate block]
+    lines, channels = [], []
+    stats = {"local": 0, "backup": 0, "pocket": 0, "missing": 0, "fuzzy": 0}
+
+    # One name index per run, shared by the local and backup lookups
+    channel_index = ChannelIndex(NAME_OVERRIDES)
+    channel_index.add_source("local", local_map)
+    channel_index.add_source("backup", backup_map)
+    if pocket_map is not None: channel_index.add_source("pocket", pocket_map)
+    
     try:
-        r = requests.get(pocket_url, headers={"User-Agent": UA_HEADER}, timeout=15)
-        # REMOVED ZEE TAMIL from here. Only standard extras remain.
-        SPECIFIC_WANTED = ["rasi", "astro", "vijay takkar"]
-        
-        if r.status_code == 200:
-            lines = r.text.splitlines()
-            count = 0
-            for i in range(len(lines)):
-                line = lines[i].strip()
-                if "#EXTINF" in line:
-                    name = line.split(",")[-1].strip()
-                    name_lower = name.lower()
-                    
-                    if "apac" in name_lower: continue 
-
-                    target_group = None
-                    if 'group-title="Sports"' in line or 'group-title="Sports HD"' in line: target_group = "Sports Extra"
-                    elif 'group-title="Tamil"' in line or 'group-title="Tamil HD"' in line: target_group = "Tamil Extra"
-                    elif any(x in name_lower for x in SPECIFIC_WANTED):
-                         if "cricket" in name_lower or "sport" in name_lower: target_group = "Sports Extra"
-                         else: target_group = "Tamil Extra"
-                    
-                    if target_group:
-                        logo = ""; logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                        if logo_match: logo = logo_match.group(1)
-                        link = ""
-                        for j in range(i + 1, min(i + 5, len(lines))):
-                            potential = lines[j].strip()
-                            if potential and not potential.startswith("#"): link = potential; break
-                        if link:
-                            if "http" in link and "|" not in link: link += f"|User-Agent={UA_HEADER}"
-                            meta = f'#EXTINF:-1 group-title="{target_group}" tvg-logo="{logo}",{name}'
-                            entries.append(meta)
-                            entries.append(link)
-                            count += 1
-            print(f"✅ Extracted {count} Requested Channels.")
-    except Exception as e: print(f"❌ Error Pocket TV: {e}")
-    return entries
+        with open(template_file, "r", encoding="utf-8") as f:
+            for entry in iter_entries(f):
+                line = entry.extinf
+                lower_line = line.lower()
+                if 'group-title="youtube' in lower_line or 'group-title="temporary' in lower_line: continue
+
+                original_name = entry.name
+                ch_name_lower = original_name.lower()
+                if any(rm in ch_name_lower for rm in REMOVE_KEYWORDS): continue
+
+                if "http://placeholder" in entry.url:
+                    lines.append(line)
+                    matches = channel_index.resolve_all(original_name) if pocket_map is not None else \
+                        [m for m in [channel_index.resolve(original_name)] if m]
+                    if not matches:
+                        lines.append(f"{base_url}/000.m3u8"); stats["missing"] += 1
+                    else:
+                        source, _, how = matches[0]
+                        blocks = candidate_blocks(matches)
+                        if len(blocks) > 1: channels.append([len(lines), len(blocks[0]), line, blocks])
+                        lines.extend(blocks[0])
+                        stats[source] += 1
+                        if how == "fuzzy": stats["fuzzy"] += 1
+                else:
+                    lines.append(line); lines.append(entry.url_line)
+    except FileNotFoundError: pass
+    return {"lines": lines, "stats": stats, "channels": channels}
+
+def ranked_template_lines(template):
+    # Puts each multi-source channel's best candidate in its place and adds
+    # the runners-up after the section as Backup entries, best first
+    if not template["channels"]: return template["lines"]
+    ranked = rank_channels([(extinf, blocks) for _, _, extinf, blocks in template["channels"]])
+    lines, backups, pos = [], [], 0
+    for (at, size, extinf, _), (_, blocks) in zip(template["channels"], ranked):
+        lines.extend(template["lines"][pos:at])
+        lines.extend(blocks[0])
+        pos = at + size
+        backup_extinf = M3UEntry(extinf).extinf_with({"group-title": BACKUP_GROUP})
+        for block in blocks[1:]:
+            backups.append(backup_extinf)
+            backups.extend(block)
+    lines.extend(template["lines"][pos:])
+    return lines + backups
 
 # ==========================================
 # 3. MAIN EXECUTION
@@ -181,64 +218,46 @@ def fetch_pocket_extras():
 def update_playlist():
     print("--- STARTING UPDATE ---")
     ist_now = datetime.datetime.utcnow() + datetime.timedelta(hours=5, minutes=30)
-    final_lines = ["#EXTM3U", f"# Updated on: {ist_now.strftime('%Y-%m-%d %H:%M:%S IST')}"]
     
-    local_map = load_local_map(reference_file)
-    backup_map = fetch_backup_map(backup_url)
-    stats = {"local": 0, "backup": 0, "missing": 0}
-    
-    try:
-        with open(template_file, "r", encoding="utf-8") as f: lines = f.readlines()
-        skip_next_url = False 
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line: continue
-            
-            if line.startswith("#EXTINF"):
-                lower_line = line.lower()
-                if 'group-title="youtube' in lower_line or 'group-title="temporary' in lower_line:
-                    skip_next_url = True; continue              
-                
-                skip_next_url = False
-                original_name = line.split(",")[-1].strip()
-                ch_name_lower = original_name.lower()
-                
-                should_remove = False
-                for rm in REMOVE_KEYWORDS:
-                    if rm in ch_name_lower: should_remove = True; break
-                if should_remove: 
-                    skip_next_url = True; continue
-
-                if i + 1 < len(lines) and "http://placeholder" in lines[i+1]:
-                    clean_key = clean_name_key(original_name)
-                    found_block = None
-                    mapped_key = clean_name_key(NAME_OVERRIDES.get(ch_name_lower, ""))
-                    if clean_key in local_map:
-                         final_lines.append(line); final_lines.append(f"{base_url}/{local_map[clean_key]}.m3u8")
-                         skip_next_url = True; stats["local"] += 1
-                    elif mapped_key and mapped_key in local_map:
-                         final_lines.append(line); final_lines.append(f"{base_url}/{local_map[mapped_key]}.m3u8")
-                         skip_next_url = True; stats["local"] += 1
-                    else:
-                         found_block = find_best_backup_link(original_name, backup_map)
-                         if found_block:
-                             final_lines.append(line); final_lines.extend(found_block)
-                             skip_next_url = True; stats["backup"] += 1
-                         else:
-                             final_lines.append(line); final_lines.append(f"{base_url}/000.m3u8")
-                             skip_next_url = True; stats["missing"] += 1
-                else: final_lines.append(line)
-            elif not line.startswith("#"):
-                if skip_next_url: skip_next_url = False
-                else: final_lines.append(line)
-    except FileNotFoundError: pass
+    with metrics.timed_stage("local map"): local_map = load_local_map(reference_file)
+    metrics.record("stages", "local map", entries=len(local_map))
+    backup_map, fancode_lines, sony_lines, zee_lines, pocket = run_fetch_jobs([
+        ("backup", fetch_backup_map, (backup_url,), {}),
+        ("fancode", fetch_and_group, (fancode_url, "Live Events"), []),
+        ("sony", fetch_and_group, (sony_m3u, "Live Events"), []),
+        ("zee5", fetch_and_group, (zee_m3u, "Live Events"), []),
+        ("pocket", fetch_pocket_sources, (), {"extras": [], "map": {}}),
+    ])
+    pocket_lines = pocket["extras"]
+    pocket_map = pocket["map"] if RANK_MODE == "on" else None
+    metrics.record("sources", "backup", entries=len(backup_map))
+    for name, lines in (("fancode", fancode_lines), ("sony", sony_lines), ("zee5", zee_lines), ("pocket", pocket_lines)):
+        metrics.record("sources", name, entries=metrics.count_entries(lines))
+
+    # Template section is rebuilt only when the template, reference map or backup changed
+    with metrics.timed_stage("template"):
+        template = section("template", [file_digest(template_file), local_map, backup_map, pocket_map],
+                           lambda: build_template_section(local_map, backup_map, pocket_map))
+    stats = template["stats"]
+    metrics.record("stages", "template", entries=metrics.count_entries(template["lines"]), **stats)
 
-    print("🎥 Appending Live Events..."); final_lines.extend(fetch_and_group(fancode_url, "Live Events")); final_lines.extend(fetch_and_group(sony_m3u, "Live Events")); final_lines.extend(fetch_and_group(zee_m3u, "Live Events"))
-    final_lines.extend(fetch_pocket_extras())
-    print("🎥 Appending Temporary Channels..."); final_lines.extend(parse_youtube_txt())
+    print("🎥 Appending Temporary Channels...")
+    with metrics.timed_stage("youtube"): youtube_lines = section("youtube", [file_digest(youtube_file)], parse_youtube_txt)
+    metrics.record("sources", "youtube.txt", entries=metrics.count_entries(youtube_lines))
 
-    with open(output_file, "w", encoding="utf-8") as f: f.write("\n".join(final_lines))
-    print(f"🎉 DONE. Local: {stats['local']} | Backup: {stats['backup']} | Missing: {stats['missing']}")
+    # Sections are chained straight into the writer, never copied into one big list
+    print("🎥 Appending Live Events...")
+    final_lines = itertools.chain(
+        [epg.playlist_header(output_file), f"# Updated on: {ist_now.strftime('%Y-%m-%d %H:%M:%S IST')}"],
+        ranked_template_lines(template), fancode_lines, sony_lines, zee_lines, pocket_lines, youtube_lines)
+    with metrics.timed_stage("write"): changed = write_if_changed(output_file, apply_probe(final_lines))
+    write_variants(output_file, changed)
+    # Trimmed guide for the channels just written, read from the template's x-tvg-url
+    epg.build_epg(output_file, guide_url=epg.header_guide_url(template_file))
+    save_manifest()
+    http_session.print_cache_stats()
+    metrics.write_metrics("playlist", http_cache=dict(http_session.STATS), sections=dict(SECTION_STATS))
+    print(f"🎉 DONE. Local: {stats['local']} | Backup: {stats['backup']} | Pocket: {stats['pocket']} | Missing: {stats['missing']} | Fuzzy: {stats['fuzzy']}")
 
 if __name__ == "__main__":
     update_playlist()
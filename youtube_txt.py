@@ -0,0 +1,71 @@
+import re
+from collections import namedtuple
+
+# ==========================================
+# youtube.txt FORMAT
+# ==========================================
+# The hand-edited list of temporary channels:
+#
+#   Title : Fox 4k
+#   Logo : https://...png
+#   #KODIPROP:inputstream.adaptive.license_key=...   (optional, any number)
+#   Link: https://host/x.m3u8|User-Agent=...&Referer=...
+#
+# Keys are case-insensitive with optional spaces around the colon; a bare
+# http(s)/rtmp line counts as a Link. Title, Logo and props collect until a
+# Link closes the channel; a Link that is empty or not a stream URL closes it
+# without a channel. Blank and unknown lines are ignored, and no line is too
+# long: DRM links with cookies and keys routinely pass 600 chars.
+YoutubeChannel = namedtuple("YoutubeChannel", "title logo props link")
+KEY_RE = re.compile(r'^(title|logo|link)\s*:\s*(.*)$', re.IGNORECASE)
+STREAM_PREFIXES = ("http://", "https://", "rtmp://", "rtmps://")
+
+def read_youtube_txt(lines):
+    # Streams channels out of any iterable of lines (file object, list, stdin)
+    title, logo, props = "", "", []
+    for line in lines:
+        line = line.strip()
+        if not line: continue
+        key = KEY_RE.match(line)
+        if key:
+            field, value = key.group(1).lower(), key.group(2).strip()
+            if field == "title": title = value
+            elif field == "logo": logo = value
+            else:
+                if value.lower().startswith(STREAM_PREFIXES): yield YoutubeChannel(title, logo, tuple(props), value)
+                title, logo, props = "", "", []
+        elif line.startswith("#"): props.append(line)
+        elif line.lower().startswith(STREAM_PREFIXES):
+            yield YoutubeChannel(title, logo, tuple(props), line)
+            title, logo, props = "", "", []
+
+def format_youtube_txt(channels):
+    lines = []
+    for ch in channels:
+        lines.append(f"Title: {ch.title}")
+        if ch.logo: lines.append(f"Logo: {ch.logo}")
+        lines.extend(ch.props)
+        lines.append(f"Link: {ch.link}")
+        lines.append("")  # Empty line for separation
+    return lines
+
+def render_m3u(channels, group="Temporary Channels", default_title="Temporary Channel",
+               logo_for=lambda title: "", user_agent=None):
+    # youtube.txt channels -> M3U lines (props first, then #EXTINF and URL).
+    # logo_for(title) fills in missing or stub (< 5 chars) logos; user_agent is appended to links
+    # that carry no |header suffix.
+    lines = []
+    for ch in channels:
+        title = ch.title or default_title
+        logo = ch.logo if len(ch.logo) >= 5 else logo_for(title)
+        link = ch.link
+        if user_agent and "|" not in link and link.startswith("http"): link += f"|User-Agent={user_agent}"
+        lines.extend(ch.props)
+        lines.append(f'#EXTINF:-1 group-title="{group}" tvg-logo="{logo}",{title}')
+        lines.append(link)
+    return lines
+
+def load_youtube_txt(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f: return list(read_youtube_txt(f))
+    except OSError: return []